@@ -0,0 +1,139 @@
+"""Priority admission control for LLM calls"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+
+from backend.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Completions (including streams being read) running at once in the process
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "50"))
+
+# Lower value goes first
+PRIORITY_PREMIUM = 0
+PRIORITY_SINGLE_CARD = 1
+PRIORITY_SPREAD = 2
+PRIORITY_DEEP_SPREAD = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_PREMIUM: "premium",
+    PRIORITY_SINGLE_CARD: "single_card",
+    PRIORITY_SPREAD: "spread",
+    PRIORITY_DEEP_SPREAD: "deep_spread",
+}
+
+# Longest wait for a slot; past it the reading fails instead of queueing further
+QUEUE_DEADLINES = {
+    PRIORITY_PREMIUM: 30.0,
+    PRIORITY_SINGLE_CARD: 15.0,
+    PRIORITY_SPREAD: 10.0,
+    PRIORITY_DEEP_SPREAD: 5.0,
+}
+
+# Priority of free users' readings; premium users always get PRIORITY_PREMIUM
+READING_PRIORITIES = {
+    "card_of_day": PRIORITY_SINGLE_CARD,
+    "tarot_advice": PRIORITY_SINGLE_CARD,
+    "one_question": PRIORITY_SINGLE_CARD,
+    "three_card_spread": PRIORITY_SPREAD,
+    "deep_spread": PRIORITY_DEEP_SPREAD,
+}
+
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "tarot_llm_admission_wait_seconds", "Time LLM calls waited for a slot",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0)
+)
+ADMISSION_REJECTED = registry.counter(
+    "tarot_llm_admission_rejected_total", "LLM calls that failed after waiting past their deadline"
+)
+
+
+class AdmissionRejected(Exception):
+    """No LLM slot became free before the call's queue deadline"""
+
+
+def reading_priority(reading_type: str, user: Optional[dict] = None) -> int:
+    """Admission priority of a reading for this user"""
+    if user is not None and user.get("premium", False):
+        return PRIORITY_PREMIUM
+    return READING_PRIORITIES.get(reading_type, PRIORITY_SPREAD)
+
+
+class AdmissionController:
+    """
+    Bounded concurrency budget with a priority queue
+
+    At most `limit` calls hold a slot at once. The others wait in priority
+    order (first come first served within a priority); a released slot is
+    handed straight to the best waiter. A waiter not admitted within its
+    deadline gets AdmissionRejected, so overload turns into quick refusals
+    of the cheapest-to-lose work rather than everyone's latency growing.
+
+        async with admission.slot(PRIORITY_PREMIUM):
+            ...
+    """
+
+    def __init__(self, limit: int = LLM_MAX_CONCURRENT):
+        self.limit = limit
+        self._active = 0
+        # (priority, arrival, future); futures of waiters that gave up stay until popped
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @asynccontextmanager
+    async def slot(self, priority: int, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold one slot for the block; raises AdmissionRejected after `deadline` seconds in the queue"""
+        started = time.perf_counter()
+        await self._acquire(priority, QUEUE_DEADLINES.get(priority, 10.0) if deadline is None else deadline)
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started, priority=PRIORITY_NAMES.get(priority, priority))
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int, deadline: float):
+        self._drop_abandoned()
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), waiter))
+        try:
+            # The slot is handed over with _active already counting it
+            await asyncio.wait_for(waiter, deadline)
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTED.inc(priority=PRIORITY_NAMES.get(priority, priority))
+            raise AdmissionRejected(f"no LLM slot within {deadline:g}s")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Cancelled right after being admitted: pass the slot on
+                self._release()
+            raise
+
+    def _release(self):
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def _drop_abandoned(self):
+        """Pop timed out waiters off the head, so a free slot is never held back by them"""
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+
+
+# Shared by every TarotInterpreter of the process
+admission = AdmissionController()
@@ -0,0 +1,75 @@
+"""Cache of generated interpretations for question-less readings"""
+import os
+import random
+import logging
+from typing import Hashable, List, Optional
+
+from backend.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# How many different texts to keep per (variant, card, orientation, time of day)
+CACHE_VARIANTS = int(os.getenv("INTERPRETATION_CACHE_VARIANTS", "3"))
+CACHE_TTL = float(os.getenv("INTERPRETATION_CACHE_TTL", str(6 * 3600)))
+CACHE_MAX_KEYS = int(os.getenv("INTERPRETATION_CACHE_MAX_KEYS", "2000"))
+
+
+class InterpretationCache:
+    """
+    TTL/LRU cache holding a pool of pre-generated variants per key
+
+    While a pool has fewer than `variants` texts every request is a miss,
+    so new variants get generated; once it is full, answers are served
+    from the pool at random.
+    """
+
+    def __init__(self, variants: int = CACHE_VARIANTS, ttl: float = CACHE_TTL,
+                 max_keys: int = CACHE_MAX_KEYS):
+        self.variants = variants
+        self._pools = TTLCache(maxsize=max_keys, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.variants > 0
+
+    def pick(self, key: Hashable) -> Optional[str]:
+        """Get a cached variant, or None if a new one should be generated"""
+        if not self.enabled:
+            return None
+
+        pool: Optional[List[str]] = self._pools.get(key)
+        if pool and len(pool) >= self.variants:
+            self.hits += 1
+            return random.choice(pool)
+
+        self.misses += 1
+        return None
+
+    def add(self, key: Hashable, text: str):
+        """Add a freshly generated variant to the key's pool"""
+        if not self.enabled or not text:
+            return
+
+        pool = self._pools.get(key)
+        if pool is None:
+            # The pool's lifetime starts with its first variant
+            self._pools.set(key, [text])
+        elif len(pool) < self.variants:
+            pool.append(text)
+
+    def clear(self):
+        self._pools.clear()
+
+
+_cache: Optional[InterpretationCache] = None
+
+
+def get_interpretation_cache() -> InterpretationCache:
+    """Get the process-wide interpretation cache"""
+    global _cache
+    if _cache is None:
+        _cache = InterpretationCache()
+        logger.info(f"Interpretation cache: {CACHE_VARIANTS} variants per key, TTL {CACHE_TTL:.0f}s")
+    return _cache
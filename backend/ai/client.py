@@ -0,0 +1,86 @@
+"""Shared async OpenAI client with a pooled HTTP transport"""
+import asyncio
+import os
+import random
+import logging
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+    RateLimitError,
+)
+
+logger = logging.getLogger(__name__)
+
+# Connection pool for all LLM calls of the process
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+REQUEST_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+# Errors worth another try; anything else (bad request, auth) fails at once
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
+
+T = TypeVar("T")
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def create_openai_client(api_key: str) -> AsyncOpenAI:
+    """Create an AsyncOpenAI client backed by a pooled keep-alive transport"""
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+        ),
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=10.0)
+    )
+    return AsyncOpenAI(api_key=api_key, http_client=http_client)
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Get the process-wide AsyncOpenAI client, creating it on first use"""
+    global _client
+    if _client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+        _client = create_openai_client(api_key)
+        logger.info(f"OpenAI client created (max connections: {MAX_CONNECTIONS})")
+    return _client
+
+
+async def close_openai_client():
+    """Close the shared client and its connection pool"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+        logger.info("OpenAI client closed")
+
+
+async def call_with_backoff(
+    call: Callable[[], Awaitable[T]],
+    attempts: int = 4,
+    base_delay: float = 1.0,
+    max_delay: float = 20.0
+) -> T:
+    """
+    Await `call()`, retrying transient OpenAI errors with jittered exponential backoff
+    
+    Delays are drawn uniformly from [0, min(max_delay, base_delay * 2^n)]
+    ("full jitter"), so retries from many callers don't arrive together.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return await call()
+        except RETRYABLE_ERRORS as e:
+            if attempt == attempts:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            logger.warning(f"OpenAI call failed ({type(e).__name__}), retry {attempt}/{attempts - 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
@@ -1,15 +1,24 @@
-import os
 from dotenv import load_dotenv
-from openai import OpenAI
-from typing import List, Dict
+from openai import AsyncOpenAI
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 import logging
+import time
 from datetime import datetime
 
+from backend.ai.admission import PRIORITY_SPREAD, AdmissionController, admission as default_admission
+from backend.ai.client import get_openai_client
+from backend.ai.prompts import registry as prompt_registry
+from backend.ai.cache import InterpretationCache, get_interpretation_cache
+from backend.metrics import LLM_FIRST_TOKEN_SECONDS, record_usage, timed
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Fixed question of the "⭐ Совет Таро" reading
+ADVICE_QUESTION = "Какой совет карты могут дать мне прямо сейчас?"
+
 
 def get_time_context() -> str:
     """Get contextual phrase based on time of day"""
@@ -27,15 +36,7 @@ def get_time_context() -> str:
         return "в это время, когда наступает час рефлексии"
 
 
-class TarotInterpreter:
-    """Generates mystical AI interpretations for Tarot readings using GPT-4o"""
-    
-    def __init__(self):
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-        
-        self.system_message = """Ты — живой, мягкий и мудрый Таро-проводник.
+SYSTEM_MESSAGE = """Ты — живой, мягкий и мудрый Таро-проводник.
 Твоя задача — чтобы человек почувствовал настоящее присутствие, внимание и эмоциональное тепло.
 Ты отвечаешь как духовный наставник, а не как сухой алгоритм.
 
@@ -67,77 +68,103 @@ class TarotInterpreter:
 
 Отвечай сразу с интерпретации, создавай атмосферу присутствия и поддержки.
 ОБЯЗАТЕЛЬНО используй только русский язык в ответе!"""
-    
-    async def interpret_single_card(self, card: Dict, question: str = None) -> str:
-        """Generate interpretation for a single card"""
-        client = OpenAI(api_key=self.api_key)
-        
-        is_reversed = card.get('is_reversed', False)
-        reversed_text = "перевёрнутая" if is_reversed else "прямая"
-        card_meaning = card['reversed'] if is_reversed else card['upright']
-        time_context = get_time_context()
-        
-        if question:
-            prompt = f"""Человек пришёл {time_context} с вопросом, который его волнует.
 
-Его вопрос: "{question}"
+DEEP_SPREAD_SYSTEM_MESSAGE = """Ты — профессиональный таролог, который делает углублённые расклады Таро.
 
-Карта, которая пришла: {card['name_ru']} ({reversed_text})
-Значение карты: {card_meaning}
+ТВОЙ СТИЛЬ:
+- мягкий, духовный, уверенный
+- простые и красивые формулировки
+- без лишней эзотерики, только суть
+- 1-2 эмодзи максимум
+- никаких пугающих предсказаний
+
+ОБЩИЕ ПРАВИЛА:
+1. Всегда указывай названия всех карт расклада
+2. Каждой карте дай краткое значение (1 предложение)
+3. Интерпретируй карты связанно, как единую историю
+4. Обязательно добавляй мягкий совет
+5. Если карта повторяется или выпадают старшие арканы — отмечай это
+
+КОНЕЧНЫЙ ФОРМАТ:
+- краткое вступление
+- интерпретация по позициям
+- общая связная история
+- практичный совет
+- мягкая поддержка
+
+Ты — не просто таролог, ты проводник.
+Отвечай глубоко, но легко, как будто говоришь с человеком лично.
+
+ОБЯЗАТЕЛЬНО: Отвечай ТОЛЬКО на русском языке! НЕ используй украинский язык!"""
+
+ENERGY_SYSTEM_MESSAGE = """Ты — тонкий проводник, который умеет читать энергетическое состояние человека через карты Таро.
+
+ТВОЯ ЗАДАЧА:
+Дать человеку описание его энергетики: эмоциональной, внутренней, внешней и духовной.
+
+ТВОЙ ТОН:
+- тёплый, поддерживающий
+- мягкий, но уверенный
+- как будто ты чувствуешь настроение человека
+- не клишированный, а живой
+
+СТРУКТУРА:
+1. Общая энергетика сейчас
+2. Что сильное в человеке
+3. Что может вызывать напряжение
+4. На что обратить внимание
+5. Маленький совет
+6. Ободряющая фраза
+
+ИСПОЛЬЗУЙ:
+- образы света, движения, интуиции
+- не предсказывай судьбу напрямую
+- не говори про негатив жестко
+- делай акцент на росте и мягких шагах
+
+ФИНАЛ:
+Всегда завершай лёгкой фразой поддержки:
+"Ты на правильном пути", "Эта энергия приведёт тебя к ясности",
+"Слушай себя — твоё сердце знает верный шаг".
+
+ОБЯЗАТЕЛЬНО: Весь ответ только на русском языке! НЕ украинский!"""
+
+# Prompts keep their instructions first and the drawn cards, time of day and question last
+SINGLE_CARD_QUESTION_PROMPT = prompt_registry.template(
+    "single_card.question",
+    system=SYSTEM_MESSAGE,
+    instructions="""Человек пришёл с вопросом, который его волнует. Ниже — карта, которая пришла, время, когда он пришёл, и его вопрос.
 
 Дай живую, тёплую интерпретацию. Почувствуй энергию вопроса. Объясни, как эта карта отвечает и что она советует.
 Будь эмпатичным, мягким, но честным. Используй максимум 1 эмодзи.
 
-ВАЖНО: Отвечай СТРОГО на русском языке! Никакого украинского!"""
-        else:
-            prompt = f"""Человек запросил Карту Дня {time_context}.
+ВАЖНО: Отвечай СТРОГО на русском языке! Никакого украинского!""",
+    variables="""Карта, которая пришла: {card_name} ({orientation})
+Значение карты: {card_meaning}
 
-Карта: {card['name_ru']} ({reversed_text})
-Значение: {card_meaning}
+Человек пришёл {time_context}.
+Его вопрос: "{question}\""""
+)
+
+CARD_OF_DAY_PROMPT = prompt_registry.template(
+    "single_card.day",
+    system=SYSTEM_MESSAGE,
+    instructions="""Человек запросил Карту Дня. Ниже — карта и время, когда он пришёл.
 
 Дай живую, тёплую интерпретацию того, какую энергию несёт эта карта для сегодняшнего дня.
 Будь поддерживающим, создай атмосферу заботы. Используй максимум 1 эмодзи.
 
-ВАЖНО: Отвечай СТРОГО на русском языке! Никакого украинского!"""
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": self.system_message},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        logger.info(f"Generated interpretation for {card['name_ru']}")
-        return response.choices[0].message.content
-    
-    async def interpret_three_card_spread(self, cards: List[Dict], question: str = None) -> str:
-        """Generate interpretation for 3-card spread (Past-Present-Future)"""
-        client = OpenAI(api_key=self.api_key)
-        
-        positions = ["Прошлое", "Настоящее", "Будущее"]
-        cards_info = []
-        
-        for i, card in enumerate(cards[:3]):
-            is_reversed = card.get('is_reversed', False)
-            reversed_text = "перевёрнутая" if is_reversed else "прямая"
-            meaning = card['reversed'] if is_reversed else card['upright']
-            cards_info.append(f"{positions[i]}: {card['name_ru']} ({reversed_text}) - {meaning}")
-        
-        cards_text = "\n".join(cards_info)
-        time_context = get_time_context()
-        
-        # Check if there are multiple Major Arcana
-        major_count = sum(1 for card in cards[:3] if card.get('id', 0) < 22)
-        significance_note = "\n(Заметь: выпало несколько Старших Арканов — период значимый, важный)" if major_count >= 2 else ""
-        
-        if question:
-            prompt = f"""Человек пришёл {time_context} с волнующим его вопросом.
+ВАЖНО: Отвечай СТРОГО на русском языке! Никакого украинского!""",
+    variables="""Карта: {card_name} ({orientation})
+Значение: {card_meaning}
 
-Его вопрос: "{question}"
+Человек пришёл {time_context}."""
+)
 
-Расклад "Прошлое - Настоящее - Будущее":
-{cards_text}{significance_note}
+THREE_CARD_QUESTION_PROMPT = prompt_registry.template(
+    "three_card.question",
+    system=SYSTEM_MESSAGE,
+    instructions="""Человек пришёл с волнующим его вопросом. Ниже — расклад "Прошлое - Настоящее - Будущее", время, когда он пришёл, и его вопрос.
 
 Дай живую, тёплую интерпретацию расклада:
 - Начни с эмпатии к вопросу
@@ -149,12 +176,18 @@ class TarotInterpreter:
 Будь как живой наставник, который чувствует энергию и поддерживает.
 Объём: 250-350 слов. Используй максимум 1-2 эмодзи.
 
-ОБЯЗАТЕЛЬНО: Весь ответ только на русском языке! НЕ используй украинский!"""
-        else:
-            prompt = f"""Человек запросил общий расклад {time_context}.
+ОБЯЗАТЕЛЬНО: Весь ответ только на русском языке! НЕ используй украинский!""",
+    variables="""Расклад "Прошлое - Настоящее - Будущее":
+{cards}{significance_note}
+
+Человек пришёл {time_context}.
+Его вопрос: "{question}\""""
+)
 
-Расклад "Прошлое - Настоящее - Будущее":
-{cards_text}{significance_note}
+THREE_CARD_GENERAL_PROMPT = prompt_registry.template(
+    "three_card.general",
+    system=SYSTEM_MESSAGE,
+    instructions="""Человек запросил общий расклад. Ниже — расклад "Прошлое - Настоящее - Будущее" и время, когда он пришёл.
 
 Дай живую, мудрую интерпретацию жизненного пути:
 - Начни с тёплого обращения
@@ -166,59 +199,17 @@ class TarotInterpreter:
 Будь как мудрый друг, который видит картину целиком и поддерживает.
 Объём: 250-350 слов. Используй максимум 1-2 эмодзи.
 
-ОБЯЗАТЕЛЬНО: Весь ответ только на русском языке! НЕ используй украинский!"""
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": self.system_message},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        logger.info("Generated 3-card interpretation")
-        return response.choices[0].message.content
-    
-    async def interpret_deep_spread(self, cards: List[Dict], spread_type: str, question: str = None) -> str:
-        """Generate interpretation for deep spreads (5, 7 cards or Deep Path)"""
-        client = OpenAI(api_key=self.api_key)
-        
-        time_context = get_time_context()
-        
-        # Check Major Arcana count
-        major_count = sum(1 for card in cards if card.get('id', 0) < 22)
-        significance_note = f"\n(Выпало {major_count} Старших Арканов — период особенно значимый)" if major_count >= 3 else ""
-        
-        # Build cards description
-        cards_info = []
-        
-        if spread_type == "5_cards":
-            positions = ["Прошлое", "Настоящее", "Будущее", "Скрытые влияния", "Совет"]
-            spread_name = "Расклад на 5 карт"
-        elif spread_type == "7_cards":
-            positions = ["Внешние обстоятельства", "Внутренние ощущения", "Что помогает", 
-                        "Что мешает", "Правильное действие", "К чему всё идёт", "Итог"]
-            spread_name = "Расклад на 7 карт"
-        else:  # deep_path
-            positions = ["Твоё текущее состояние", "Твоя главная блокировка", "Что поддерживает",
-                        "Главный урок", "Путь души", "Как действовать", "К чему приведёт путь"]
-            spread_name = "Глубинный путь"
-        
-        for i, card in enumerate(cards):
-            is_reversed = card.get('is_reversed', False)
-            reversed_text = "перевёрнутая" if is_reversed else "прямая"
-            meaning = card['reversed'] if is_reversed else card['upright']
-            cards_info.append(f"{i+1}) {positions[i]}: {card['name_ru']} ({reversed_text}) - {meaning}")
-        
-        cards_text = "\n".join(cards_info)
-        
-        if question:
-            prompt = f"""Человек пришёл {time_context} с важным вопросом.
+ОБЯЗАТЕЛЬНО: Весь ответ только на русском языке! НЕ используй украинский!""",
+    variables="""Расклад "Прошлое - Настоящее - Будущее":
+{cards}{significance_note}
 
-Его вопрос: "{question}"
+Человек пришёл {time_context}."""
+)
 
-{spread_name}:
-{cards_text}{significance_note}
+DEEP_SPREAD_QUESTION_PROMPT = prompt_registry.template(
+    "deep_spread.question",
+    system=DEEP_SPREAD_SYSTEM_MESSAGE,
+    instructions="""Человек пришёл с важным вопросом. Ниже — его расклад, время, когда он пришёл, и его вопрос.
 
 Дай углублённую, структурированную интерпретацию:
 - Начни с эмпатии к вопросу
@@ -228,12 +219,18 @@ class TarotInterpreter:
 - Заверши поддержкой
 
 Будь как мудрый проводник, который видит глубину ситуации.
-Объём: 350-450 слов. Используй 1-2 эмодзи."""
-        else:
-            prompt = f"""Человек запросил глубокий расклад {time_context} для понимания своего пути.
+Объём: 350-450 слов. Используй 1-2 эмодзи.""",
+    variables="""{spread_name}:
+{cards}{significance_note}
 
-{spread_name}:
-{cards_text}{significance_note}
+Человек пришёл {time_context}.
+Его вопрос: "{question}\""""
+)
+
+DEEP_SPREAD_GENERAL_PROMPT = prompt_registry.template(
+    "deep_spread.general",
+    system=DEEP_SPREAD_SYSTEM_MESSAGE,
+    instructions="""Человек запросил глубокий расклад для понимания своего пути. Ниже — его расклад и время, когда он пришёл.
 
 Дай углублённую, мудрую интерпретацию жизненного пути:
 - Начни с тёплого обращения
@@ -243,23 +240,241 @@ class TarotInterpreter:
 - Заверши ободрением
 
 Будь как наставник, который помогает увидеть путь целиком.
-Объём: 350-450 слов. Используй 1-2 эмодзи."""
+Объём: 350-450 слов. Используй 1-2 эмодзи.""",
+    variables="""{spread_name}:
+{cards}{significance_note}
+
+Человек пришёл {time_context}."""
+)
+
+PERSONAL_ENERGY_PROMPT = prompt_registry.template(
+    "personal_energy",
+    system=ENERGY_SYSTEM_MESSAGE,
+    instructions="""Человек пришёл для чтения личной энергетики. Ниже — карты, которые пришли для чтения энергии, кто он и когда пришёл.
+
+Дай тёплое, тонкое описание энергетического состояния:
+
+1) Общая энергетика сейчас
+2) Что сильное в человеке
+3) Что может вызывать напряжение
+4) На что обратить внимание
+5) Маленький совет
+6) Ободряющая фраза
+
+Учитывай время суток. Если ночь — упомяни энергию тишины. Если утро — упомяни ясность.
+Используй образы света, движения, интуиции.
+Не предсказывай судьбу напрямую — интерпретируй эмоциональное состояние.
+
+Будь как тонкий проводник, который чувствует энергию человека.
+Объём: 200-300 слов. Используй 1-2 эмодзи.
+Завершай поддержкой: "Ты на правильном пути", "Слушай себя — твоё сердце знает".
+
+ОБЯЗАТЕЛЬНО: Весь ответ только на русском языке! НЕ используй украинский!""",
+    variables="""Карты, которые пришли для чтения энергии: {cards}
+
+Человек по имени {name}{zodiac} пришёл {time_context}."""
+)
+
+# Positions and title of each deep spread type
+DEEP_SPREADS = {
+    "5_cards": (
+        "Расклад на 5 карт",
+        ["Прошлое", "Настоящее", "Будущее", "Скрытые влияния", "Совет"],
+    ),
+    "7_cards": (
+        "Расклад на 7 карт",
+        ["Внешние обстоятельства", "Внутренние ощущения", "Что помогает",
+         "Что мешает", "Правильное действие", "К чему всё идёт", "Итог"],
+    ),
+    "deep_path": (
+        "Глубинный путь",
+        ["Твоё текущее состояние", "Твоя главная блокировка", "Что поддерживает",
+         "Главный урок", "Путь души", "Как действовать", "К чему приведёт путь"],
+    ),
+}
+
+
+class TarotInterpreter:
+    """Generates mystical AI interpretations for Tarot readings using GPT-4o"""
+    
+    def __init__(self, client: Optional[AsyncOpenAI] = None, cache: Optional[InterpretationCache] = None,
+                 priority: int = PRIORITY_SPREAD, admission: Optional[AdmissionController] = None):
+        # One long-lived pooled client is shared by all interpreters
+        self.client = client or get_openai_client()
+        self.cache = cache if cache is not None else get_interpretation_cache()
+        # LLM calls queue for a slot of the process-wide budget at this priority (see reading_priority)
+        self.priority = priority
+        self.admission = admission or default_admission
+        
+        self.system_message = SYSTEM_MESSAGE
+    
+    @timed("interpreter.single_card")
+    async def interpret_single_card(self, card: Dict, question: str = None) -> str:
+        """Generate interpretation for a single card"""
+        cache_key = self._single_card_cache_key(card, question)
+        if cache_key:
+            cached = self.cache.pick(cache_key)
+            if cached:
+                logger.info(f"Cached interpretation for {card['name_ru']}")
+                return cached
+        
+        system_message, prompt = self._single_card_prompt(card, question)
+        result = await self._complete(system_message, prompt)
         
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": self._get_deep_spread_system_message()},
-                {"role": "user", "content": prompt}
-            ]
+        if cache_key:
+            self.cache.add(cache_key, result)
+        
+        logger.info(f"Generated interpretation for {card['name_ru']}")
+        return result
+    
+    @timed("interpreter.single_card")
+    async def stream_single_card(self, card: Dict, question: str = None) -> AsyncIterator[str]:
+        """Stream interpretation for a single card as text deltas"""
+        cache_key = self._single_card_cache_key(card, question)
+        if cache_key:
+            cached = self.cache.pick(cache_key)
+            if cached:
+                logger.info(f"Cached interpretation for {card['name_ru']}")
+                yield cached
+                return
+        
+        system_message, prompt = self._single_card_prompt(card, question)
+        chunks = []
+        async for delta in self._stream(system_message, prompt):
+            chunks.append(delta)
+            yield delta
+        
+        if cache_key:
+            self.cache.add(cache_key, "".join(chunks))
+        
+        logger.info(f"Streamed interpretation for {card['name_ru']}")
+    
+    def _single_card_cache_key(self, card: Dict, question: str = None) -> Optional[tuple]:
+        """
+        Cache key for readings whose prompt depends only on the card
+        
+        Card of the day and Tarot advice have no user input, so the prompt is
+        fully determined by the card, its orientation and the time of day.
+        """
+        if question is None:
+            variant = "card_of_day"
+        elif question == ADVICE_QUESTION:
+            variant = "advice"
+        else:
+            return None
+        return (variant, card.get('id'), bool(card.get('is_reversed', False)), get_time_context())
+    
+    def _single_card_prompt(self, card: Dict, question: str = None) -> Tuple[str, str]:
+        """System message and user prompt for a single card"""
+        is_reversed = card.get('is_reversed', False)
+        values = dict(
+            card_name=card['name_ru'],
+            orientation="перевёрнутая" if is_reversed else "прямая",
+            card_meaning=card['reversed'] if is_reversed else card['upright'],
+            time_context=get_time_context()
         )
         
+        if question:
+            template = SINGLE_CARD_QUESTION_PROMPT
+            values["question"] = question
+        else:
+            template = CARD_OF_DAY_PROMPT
+        
+        return template.system, template.render(**values)
+    
+    @timed("interpreter.three_card_spread")
+    async def interpret_three_card_spread(self, cards: List[Dict], question: str = None) -> str:
+        """Generate interpretation for 3-card spread (Past-Present-Future)"""
+        system_message, prompt = self._three_card_prompt(cards, question)
+        result = await self._complete(system_message, prompt)
+        
+        logger.info("Generated 3-card interpretation")
+        return result
+    
+    @timed("interpreter.three_card_spread")
+    async def stream_three_card_spread(self, cards: List[Dict], question: str = None) -> AsyncIterator[str]:
+        """Stream interpretation for 3-card spread as text deltas"""
+        system_message, prompt = self._three_card_prompt(cards, question)
+        async for delta in self._stream(system_message, prompt):
+            yield delta
+        
+        logger.info("Streamed 3-card interpretation")
+    
+    def _three_card_prompt(self, cards: List[Dict], question: str = None) -> Tuple[str, str]:
+        """System message and user prompt for 3-card spread"""
+        positions = ["Прошлое", "Настоящее", "Будущее"]
+        cards_info = []
+        
+        for i, card in enumerate(cards[:3]):
+            is_reversed = card.get('is_reversed', False)
+            reversed_text = "перевёрнутая" if is_reversed else "прямая"
+            meaning = card['reversed'] if is_reversed else card['upright']
+            cards_info.append(f"{positions[i]}: {card['name_ru']} ({reversed_text}) - {meaning}")
+        
+        # Check if there are multiple Major Arcana
+        major_count = sum(1 for card in cards[:3] if card.get('id', 0) < 22)
+        significance_note = "\n(Заметь: выпало несколько Старших Арканов — период значимый, важный)" if major_count >= 2 else ""
+        
+        values = dict(cards="\n".join(cards_info), significance_note=significance_note, time_context=get_time_context())
+        if question:
+            template = THREE_CARD_QUESTION_PROMPT
+            values["question"] = question
+        else:
+            template = THREE_CARD_GENERAL_PROMPT
+        
+        return template.system, template.render(**values)
+    
+    @timed("interpreter.deep_spread")
+    async def interpret_deep_spread(self, cards: List[Dict], spread_type: str, question: str = None) -> str:
+        """Generate interpretation for deep spreads (5, 7 cards or Deep Path)"""
+        system_message, prompt = self._deep_spread_prompt(cards, spread_type, question)
+        result = await self._complete(system_message, prompt)
+        
         logger.info(f"Generated deep spread interpretation: {spread_type}")
-        return response.choices[0].message.content
+        return result
+    
+    @timed("interpreter.deep_spread")
+    async def stream_deep_spread(self, cards: List[Dict], spread_type: str, question: str = None) -> AsyncIterator[str]:
+        """Stream interpretation for deep spreads as text deltas"""
+        system_message, prompt = self._deep_spread_prompt(cards, spread_type, question)
+        async for delta in self._stream(system_message, prompt):
+            yield delta
+        
+        logger.info(f"Streamed deep spread interpretation: {spread_type}")
+    
+    def _deep_spread_prompt(self, cards: List[Dict], spread_type: str, question: str = None) -> Tuple[str, str]:
+        """System message and user prompt for deep spreads"""
+        # Check Major Arcana count
+        major_count = sum(1 for card in cards if card.get('id', 0) < 22)
+        significance_note = f"\n(Выпало {major_count} Старших Арканов — период особенно значимый)" if major_count >= 3 else ""
+        
+        spread_name, positions = DEEP_SPREADS.get(spread_type, DEEP_SPREADS["deep_path"])
+        
+        # Build cards description
+        cards_info = []
+        for i, card in enumerate(cards):
+            is_reversed = card.get('is_reversed', False)
+            reversed_text = "перевёрнутая" if is_reversed else "прямая"
+            meaning = card['reversed'] if is_reversed else card['upright']
+            cards_info.append(f"{i+1}) {positions[i]}: {card['name_ru']} ({reversed_text}) - {meaning}")
+        
+        values = dict(
+            spread_name=spread_name,
+            cards="\n".join(cards_info),
+            significance_note=significance_note,
+            time_context=get_time_context()
+        )
+        if question:
+            template = DEEP_SPREAD_QUESTION_PROMPT
+            values["question"] = question
+        else:
+            template = DEEP_SPREAD_GENERAL_PROMPT
+        
+        return template.system, template.render(**values)
     
+    @timed("interpreter.personal_energy")
     async def interpret_personal_energy(self, user_data: Dict) -> str:
         """Interpret user's personal energetics"""
-        client = OpenAI(api_key=self.api_key)
-        
         time_context = get_time_context()
         
         # Draw 3 cards for energy reading
@@ -280,100 +495,52 @@ class TarotInterpreter:
         zodiac = user_data.get('zodiac_sign', '')
         zodiac_text = f", знак зодиака: {zodiac}" if zodiac else ""
         
-        prompt = f"""Человек по имени {name}{zodiac_text} пришёл {time_context} для чтения личной энергетики.
-
-Карты, которые пришли для чтения энергии: {cards_text}
-
-Дай тёплое, тонкое описание энергетического состояния:
-
-1) Общая энергетика сейчас
-2) Что сильное в человеке
-3) Что может вызывать напряжение
-4) На что обратить внимание
-5) Маленький совет
-6) Ободряющая фраза
-
-Учитывай время суток. Если ночь — упомяни энергию тишины. Если утро — упомяни ясность.
-Используй образы света, движения, интуиции.
-Не предсказывай судьбу напрямую — интерпретируй эмоциональное состояние.
-
-Будь как тонкий проводник, который чувствует энергию человека.
-Объём: 200-300 слов. Используй 1-2 эмодзи.
-Завершай поддержкой: "Ты на правильном пути", "Слушай себя — твоё сердце знает".
-
-ОБЯЗАТЕЛЬНО: Весь ответ только на русском языке! НЕ используй украинский!"""
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": self._get_energy_system_message()},
-                {"role": "user", "content": prompt}
-            ]
+        prompt = PERSONAL_ENERGY_PROMPT.render(
+            cards=cards_text,
+            name=name,
+            zodiac=zodiac_text,
+            time_context=time_context
         )
         
+        result = await self._complete(PERSONAL_ENERGY_PROMPT.system, prompt)
+        
         logger.info(f"Generated personal energy reading for {name}")
-        return response.choices[0].message.content, cards
+        return result, cards
     
-    def _get_deep_spread_system_message(self) -> str:
-        """System message for deep spreads"""
-        return """Ты — профессиональный таролог, который делает углублённые расклады Таро.
-
-ТВОЙ СТИЛЬ:
-- мягкий, духовный, уверенный
-- простые и красивые формулировки
-- без лишней эзотерики, только суть
-- 1-2 эмодзи максимум
-- никаких пугающих предсказаний
-
-ОБЩИЕ ПРАВИЛА:
-1. Всегда указывай названия всех карт расклада
-2. Каждой карте дай краткое значение (1 предложение)
-3. Интерпретируй карты связанно, как единую историю
-4. Обязательно добавляй мягкий совет
-5. Если карта повторяется или выпадают старшие арканы — отмечай это
-
-КОНЕЧНЫЙ ФОРМАТ:
-- краткое вступление
-- интерпретация по позициям
-- общая связная история
-- практичный совет
-- мягкая поддержка
-
-Ты — не просто таролог, ты проводник.
-Отвечай глубоко, но легко, как будто говоришь с человеком лично.
-
-ОБЯЗАТЕЛЬНО: Отвечай ТОЛЬКО на русском языке! НЕ используй украинский язык!"""
+    async def _complete(self, system_message: str, prompt: str) -> str:
+        """Run one chat completion without blocking the event loop"""
+        async with self.admission.slot(self.priority):
+            response = await self.client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": prompt}
+                ]
+            )
+        record_usage(response.usage, "interpreter")
+        return response.choices[0].message.content
     
-    def _get_energy_system_message(self) -> str:
-        """System message for energy reading"""
-        return """Ты — тонкий проводник, который умеет читать энергетическое состояние человека через карты Таро.
-
-ТВОЯ ЗАДАЧА:
-Дать человеку описание его энергетики: эмоциональной, внутренней, внешней и духовной.
-
-ТВОЙ ТОН:
-- тёплый, поддерживающий
-- мягкий, но уверенный
-- как будто ты чувствуешь настроение человека
-- не клишированный, а живой
-
-СТРУКТУРА:
-1. Общая энергетика сейчас
-2. Что сильное в человеке
-3. Что может вызывать напряжение
-4. На что обратить внимание
-5. Маленький совет
-6. Ободряющая фраза
-
-ИСПОЛЬЗУЙ:
-- образы света, движения, интуиции
-- не предсказывай судьбу напрямую
-- не говори про негатив жестко
-- делай акцент на росте и мягких шагах
-
-ФИНАЛ:
-Всегда завершай лёгкой фразой поддержки:
-"Ты на правильном пути", "Эта энергия приведёт тебя к ясности",
-"Слушай себя — твоё сердце знает верный шаг".
-
-ОБЯЗАТЕЛЬНО: Весь ответ только на русском языке! НЕ украинский!"""
+    async def _stream(self, system_message: str, prompt: str) -> AsyncIterator[str]:
+        """Run one chat completion in streaming mode, yielding text deltas"""
+        # The slot is held until the stream is read to the end
+        async with self.admission.slot(self.priority):
+            started = time.perf_counter()
+            first_token = True
+            stream = await self.client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": prompt}
+                ],
+                stream=True,
+                # The last chunk then carries token usage
+                stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    record_usage(chunk.usage, "interpreter")
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token:
+                        LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started, source="interpreter")
+                        first_token = False
+                    yield chunk.choices[0].delta.content
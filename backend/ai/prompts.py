@@ -0,0 +1,130 @@
+"""
+Prompt templates with static, cache-friendly prefixes
+
+Every template is a system message and instructions that never change,
+followed by a variable part (cards, time of day, question, news) that is
+always last. Requests of one template therefore share a byte-identical
+prefix, which OpenAI reuses from its prompt cache once it is at least
+PROVIDER_CACHE_MIN_TOKENS long.
+
+Token counts per template (exact with `pip install tiktoken`, estimated
+otherwise):
+
+    python -m backend.ai.prompts
+"""
+import functools
+import string
+from typing import Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # optional; counts are estimated without it
+    tiktoken = None
+
+TOKENIZER_MODEL = "gpt-4o"
+# Shortest prefix OpenAI caches
+PROVIDER_CACHE_MIN_TOKENS = 1024
+# Estimate for mostly Cyrillic text when tiktoken is missing
+CHARS_PER_TOKEN = 3.0
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+
+
+def count_tokens(text: str) -> int:
+    """Tokens of `text` for TOKENIZER_MODEL; an estimate without tiktoken"""
+    if tiktoken is not None:
+        return len(_encoding().encode(text))
+    return round(len(text) / CHARS_PER_TOKEN)
+
+
+class PromptTemplate:
+    """
+    Prompt of one reading type: static system message and instructions, then variables
+
+    `variables` is a str.format template. render() only formats it and
+    appends it to the prefix built here, so the instructions are never
+    rebuilt per call and always come first.
+    """
+
+    def __init__(self, name: str, system: str, instructions: str, variables: str):
+        self.name = name
+        self.system = system
+        self.instructions = instructions.strip()
+        self.variables = variables.strip()
+        self.fields = tuple(field for _, field, _, _ in string.Formatter().parse(self.variables) if field)
+        self._prefix = self.instructions + "\n\n"
+
+    def render(self, extra: Optional[str] = None, **values) -> str:
+        """
+        User prompt with `values` filled in
+
+        `extra` is caller-specific static text (e.g. a channel's own rules);
+        it goes between the instructions and the variables so that it stays
+        part of that caller's cached prefix.
+        """
+        prefix = f"{self._prefix}{extra.strip()}\n\n" if extra else self._prefix
+        return prefix + self.variables.format(**values)
+
+    @functools.cached_property
+    def system_tokens(self) -> int:
+        return count_tokens(self.system)
+
+    @functools.cached_property
+    def instruction_tokens(self) -> int:
+        return count_tokens(self._prefix)
+
+    @property
+    def prefix_tokens(self) -> int:
+        """Static tokens every request of this template starts with"""
+        return self.system_tokens + self.instruction_tokens
+
+
+class PromptRegistry:
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def template(self, name: str, system: str, instructions: str, variables: str) -> PromptTemplate:
+        if name not in self._templates:
+            self._templates[name] = PromptTemplate(name, system, instructions, variables)
+        return self._templates[name]
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def report(self) -> List[Dict]:
+        """Static token counts of every template"""
+        return [
+            {
+                "template": template.name,
+                "system_tokens": template.system_tokens,
+                "instruction_tokens": template.instruction_tokens,
+                "prefix_tokens": template.prefix_tokens,
+                "cacheable": template.prefix_tokens >= PROVIDER_CACHE_MIN_TOKENS,
+                "variables": list(template.fields),
+            }
+            for template in self._templates.values()
+        ]
+
+
+registry = PromptRegistry()
+
+
+def print_report():
+    estimate = "" if tiktoken is not None else " (estimated, install tiktoken for exact counts)"
+    print(f"Static prompt tokens per template{estimate}:\n")
+    print(f"  {'template':<28} {'system':>7} {'instr.':>7} {'prefix':>7}  cached  variables")
+    for row in registry.report():
+        print(f"  {row['template']:<28} {row['system_tokens']:>7} {row['instruction_tokens']:>7} "
+              f"{row['prefix_tokens']:>7}  {'yes' if row['cacheable'] else 'no':<6}  {', '.join(row['variables'])}")
+
+
+if __name__ == "__main__":
+    # Templates register where they are used, into backend.ai.prompts rather than this __main__ module
+    from backend.ai.prompts import print_report
+    import backend.ai.interpreter  # noqa: F401
+    import backend.channel.post_generator  # noqa: F401
+
+    print_report()
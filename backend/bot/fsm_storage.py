@@ -0,0 +1,178 @@
+"""MongoDB FSM storage shared by all bot replicas"""
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from pymongo.errors import OperationFailure
+
+from backend.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Abandoned flows are removed by a TTL index this long after their last change
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", str(24 * 3600)))
+# Process cache of states (0 disables it). Only safe when every update of a user
+# reaches the same process, as with the webhook workers; behind a plain load
+# balancer another replica's changes would go unseen for up to this long
+FSM_CACHE_TTL = float(os.getenv("FSM_CACHE_TTL", "0"))
+FSM_CACHE_SIZE = 50000
+
+# Short codes for the states and data keys the handlers use; anything else is stored verbatim
+STATE_CODES = {
+    "ReadingStates:waiting_for_question": "rq",
+    "ReadingStates:waiting_for_deep_spread_type": "rd",
+    "RegistrationStates:waiting_for_name": "gn",
+    "RegistrationStates:waiting_for_birthdate": "gb",
+    "RegistrationStates:waiting_for_zodiac": "gz",
+}
+DATA_KEY_CODES = {
+    "reading_type": "r",
+    "spread_type": "p",
+    "name": "n",
+    "birthdate": "b",
+}
+# Marks verbatim keys/states that would otherwise be read as a code
+ESCAPE = "~"
+
+
+def _encoder(codes: Dict[str, str]):
+    decoded = {code: value for value, code in codes.items()}
+
+    def encode(value: str) -> str:
+        if value in codes:
+            return codes[value]
+        if value in decoded or value.startswith(ESCAPE):
+            return ESCAPE + value
+        return value
+
+    def decode(value: str) -> str:
+        if value.startswith(ESCAPE):
+            return value[len(ESCAPE):]
+        return decoded.get(value, value)
+
+    return encode, decode
+
+
+encode_state, decode_state = _encoder(STATE_CODES)
+encode_key, decode_key = _encoder(DATA_KEY_CODES)
+
+
+class MongoFSMStorage(BaseStorage):
+    """
+    FSM storage in the bot database's `fsm_states` collection
+
+    One document per key: {"_id": key, "s": state, "d": data, "t": updated}
+    with state names and data keys shortened. A TTL index on `t` drops
+    flows nobody finished. With `cache_ttl` set, reads and writes go
+    through a short-lived process cache, which also skips writes that
+    change nothing, such as state.clear() on users without a flow.
+
+        dp = Dispatcher(storage=MongoFSMStorage(db), db=db)
+    """
+
+    def __init__(self, db, state_ttl: int = FSM_STATE_TTL, cache_ttl: float = FSM_CACHE_TTL,
+                 key_builder: Optional[KeyBuilder] = None):
+        self.collection = db.db.fsm_states
+        self.state_ttl = state_ttl
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        # key -> (state, data) as stored
+        self._cache = TTLCache(maxsize=FSM_CACHE_SIZE, ttl=cache_ttl) if cache_ttl > 0 else None
+        self._indexes_ready = False
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        doc_id = self.key_builder.build(key)
+        cached = await self._cached(doc_id, load=False)
+        if cached is not None and cached[0] == state:
+            return
+
+        if state is None:
+            await self.collection.update_one(
+                {"_id": doc_id},
+                {"$unset": {"s": ""}, "$set": {"t": datetime.now(timezone.utc)}}
+            )
+        else:
+            await self._ensure_indexes()
+            await self.collection.update_one(
+                {"_id": doc_id},
+                {"$set": {"s": encode_state(state), "t": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        self._remember(doc_id, state=state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._cached(self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        data = dict(data)
+        doc_id = self.key_builder.build(key)
+        cached = await self._cached(doc_id, load=False)
+        if cached is not None and cached[1] == data:
+            return
+
+        if not data:
+            await self.collection.update_one(
+                {"_id": doc_id},
+                {"$unset": {"d": ""}, "$set": {"t": datetime.now(timezone.utc)}}
+            )
+        else:
+            await self._ensure_indexes()
+            await self.collection.update_one(
+                {"_id": doc_id},
+                {"$set": {"d": {encode_key(name): value for name, value in data.items()},
+                          "t": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        self._remember(doc_id, data=data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._cached(self.key_builder.build(key))
+        # Callers update the returned dict before set_data; never hand out the cached one
+        return dict(data)
+
+    async def close(self) -> None:
+        if self._cache is not None:
+            self._cache.clear()
+
+    async def _cached(self, doc_id: str, load: bool = True) -> Optional[tuple]:
+        """(state, data) of a key from the cache, or loaded from Mongo when `load` is set"""
+        if self._cache is not None:
+            entry = self._cache.get(doc_id)
+            if entry is not None:
+                return entry
+        if not load:
+            return None
+
+        doc = await self.collection.find_one({"_id": doc_id})
+        state = decode_state(doc["s"]) if doc and doc.get("s") else None
+        data = {decode_key(name): value for name, value in doc.get("d", {}).items()} if doc else {}
+        entry = (state, data)
+        if self._cache is not None:
+            self._cache.set(doc_id, entry)
+        return entry
+
+    def _remember(self, doc_id: str, **fields):
+        """Update the cached entry after a write; unknown halves drop it so the next read reloads"""
+        if self._cache is None:
+            return
+        entry = self._cache.get(doc_id)
+        if entry is None:
+            if len(fields) == 2:
+                self._cache.set(doc_id, (fields["state"], fields["data"]))
+            return
+        state, data = entry
+        self._cache.set(doc_id, (fields.get("state", state), fields.get("data", data)))
+
+    async def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        self._indexes_ready = True
+        try:
+            await self.collection.create_index("t", name="fsm_ttl", expireAfterSeconds=self.state_ttl)
+        except OperationFailure as e:
+            # An index with another TTL already exists; it keeps working with the old value
+            logger.warning(f"FSM TTL index not changed: {e}")
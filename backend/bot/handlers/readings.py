@@ -4,19 +4,75 @@ from aiogram.types import Message, ReplyKeyboardRemove, ReplyKeyboardMarkup, Key
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from backend.tarot.cards import TarotDeck
-from backend.ai.interpreter import TarotInterpreter
+from backend.ai.admission import AdmissionRejected, reading_priority
+from backend.ai.interpreter import TarotInterpreter, ADVICE_QUESTION
+from backend.ai.client import close_openai_client
+from backend.bot.message_stream import stream_to_message
+from backend.bot.middlewares import (
+    MetricsMiddleware,
+    ReadingGuardMiddleware,
+    RequestMetricsMiddleware,
+    UserMiddleware,
+)
+from backend.metrics import start_metrics_server
+from backend.watchdog import LoopWatchdog
+from typing import Dict, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = Router()
-
 
 class ReadingStates(StatesGroup):
     waiting_for_question = State()
     waiting_for_deep_spread_type = State()
 
 
+router = Router()
+# Handler timings; registered first so they include the user lookup
+router.message.middleware(MetricsMiddleware())
+# One reading per user at a time (handlers flagged "reading"), a started flow counting
+# until its question is answered; runs before any database work
+router.message.middleware(ReadingGuardMiddleware(
+    pending_states=(ReadingStates.waiting_for_question, ReadingStates.waiting_for_deep_spread_type)
+))
+# Loads the user document once per update and passes it to handlers as `user`
+router.message.middleware(UserMiddleware())
+
+metrics_runner = None
+loop_watchdog = LoopWatchdog("bot")
+
+
+@router.startup()
+async def on_startup(db, bot):
+    """Prepare database indexes, start batched reading persistence, metrics and the loop watchdog"""
+    global metrics_runner
+    loop_watchdog.start()
+    await db.ensure_indexes()
+    await db.check_history_query_plan()
+    db.start_writer()
+    bot.session.middleware(RequestMetricsMiddleware())
+    metrics_runner = await start_metrics_server()
+
+
+@router.shutdown()
+async def on_shutdown(db):
+    """Flush queued readings and release the shared OpenAI connection pool"""
+    global metrics_runner
+    await loop_watchdog.stop()
+    await db.stop_writer()
+    await close_openai_client()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+        metrics_runner = None
+
+
+# Reply when the LLM queue is too long for the reading to start in time
+OVERLOADED_TEXT = (
+    "🌙 Сейчас ко мне пришло очень много людей, и карты не успевают для всех. "
+    "Попробуй, пожалуйста, через минуту — этот расклад не засчитан."
+)
+
+
 def get_back_to_menu_keyboard():
     """Simple keyboard to go back to menu"""
     keyboard = ReplyKeyboardMarkup(
@@ -41,13 +97,19 @@ def get_premium_keyboard():
     return keyboard
 
 
-async def check_limits(message: Message, db, reading_type: str) -> bool:
+async def reject_overloaded(message: Message, db, reading_type: str, **kwargs):
+    """Tell the user a reading was shed by admission control and give back the quota it used"""
+    await db.refund_limit(message.from_user.id, reading_type)
+    await message.answer(OVERLOADED_TEXT, **kwargs)
+
+
+async def check_limits(message: Message, db, reading_type: str, user: Optional[Dict] = None) -> bool:
     """
     Check if user can proceed with reading
     Returns True if can proceed, False if limit reached
     """
     user_id = message.from_user.id
-    can_proceed, limit_type = await db.check_and_update_limits(user_id, reading_type)
+    can_proceed, limit_type, _ = await db.check_and_update_limits(user_id, reading_type, user=user)
     
     if not can_proceed:
         if limit_type == "premium_only":
@@ -87,18 +149,17 @@ async def check_limits(message: Message, db, reading_type: str) -> bool:
     return True
 
 
-@router.message(F.text == "✨ Карта дня")
-async def card_of_day(message: Message, db):
+@router.message(F.text == "✨ Карта дня", flags={"reading": "card_of_day"})
+async def card_of_day(message: Message, db, user: Optional[Dict] = None):
     """Handle "Card of the Day" request"""
     user_id = message.from_user.id
-    user = await db.get_user(user_id)
     
     if not user:
         await message.answer("Сначала нужно зарегистрироваться. Нажми /start")
         return
     
     # Check limits
-    if not await check_limits(message, db, "card_of_day"):
+    if not await check_limits(message, db, "card_of_day", user):
         return
     
     # Show "thinking" status with name
@@ -124,23 +185,27 @@ async def card_of_day(message: Message, db):
         deck = TarotDeck()
         card = deck.draw_card()
         
-        # Generate interpretation
-        interpreter = TarotInterpreter()
-        interpretation = await interpreter.interpret_single_card(card)
-        
         # Format response - new beautiful format
         is_reversed = card.get('is_reversed', False)
         reversed_text = " (перевёрнутая)" if is_reversed else ""
         card_name = f"{card['name_ru']}{reversed_text}"
         card_meaning = card['reversed'] if is_reversed else card['upright']
         
-        response = f"🌞 **Твоя Карта Дня**\n\n"
-        response += f"**Аркан:** {card_name}\n"
-        response += f"**Значение:** {card_meaning}\n\n"
-        response += f"**Что это значит для тебя:**\n{interpretation}\n\n"
-        response += f"✨ Пусть энергия этого дня будет мягкой и благоприятной"
+        header = f"🌞 **Твоя Карта Дня**\n\n"
+        header += f"**Аркан:** {card_name}\n"
+        header += f"**Значение:** {card_meaning}\n\n"
         
-        await message.answer(response, parse_mode="Markdown")
+        # Stream interpretation into the message as it is generated
+        interpreter = TarotInterpreter(priority=reading_priority("card_of_day", user))
+        interpretation = await stream_to_message(
+            message,
+            header + "🔮 ...",
+            interpreter.stream_single_card(card),
+            lambda text: (
+                f"{header}**Что это значит для тебя:**\n{text}\n\n"
+                f"✨ Пусть энергия этого дня будет мягкой и благоприятной"
+            )
+        )
         
         # Save to database
         await db.save_reading(
@@ -152,6 +217,8 @@ async def card_of_day(message: Message, db):
         
         logger.info(f"Card of day generated for user {user_id}: {card['name_ru']}")
         
+    except AdmissionRejected:
+        await reject_overloaded(message, db, "card_of_day")
     except Exception as e:
         logger.error(f"Error generating card of day: {e}")
         await message.answer(
@@ -159,18 +226,17 @@ async def card_of_day(message: Message, db):
         )
 
 
-@router.message(F.text == "🔮 Один вопрос")
-async def one_question_start(message: Message, state: FSMContext, db):
+@router.message(F.text == "🔮 Один вопрос", flags={"reading": "one_question", "opens_flow": True})
+async def one_question_start(message: Message, state: FSMContext, db, user: Optional[Dict] = None):
     """Start one-card reading - ask for question"""
     user_id = message.from_user.id
-    user = await db.get_user(user_id)
     
     if not user:
         await message.answer("Сначала нужно зарегистрироваться. Нажми /start")
         return
     
     # Check limits
-    if not await check_limits(message, db, "one_question"):
+    if not await check_limits(message, db, "one_question", user):
         return
     
     name = user.get('name', 'друг')
@@ -193,18 +259,17 @@ async def one_question_start(message: Message, state: FSMContext, db):
     await state.update_data(reading_type="one_question")
 
 
-@router.message(F.text == "🌙 Расклад 3 карты")
-async def three_card_spread_start(message: Message, state: FSMContext, db):
+@router.message(F.text == "🌙 Расклад 3 карты", flags={"reading": "three_card_spread", "opens_flow": True})
+async def three_card_spread_start(message: Message, state: FSMContext, db, user: Optional[Dict] = None):
     """Start 3-card spread - ask for question"""
     user_id = message.from_user.id
-    user = await db.get_user(user_id)
     
     if not user:
         await message.answer("Сначала нужно зарегистрироваться. Нажми /start")
         return
     
     # Check limits
-    if not await check_limits(message, db, "three_card_spread"):
+    if not await check_limits(message, db, "three_card_spread", user):
         return
     
     name = user.get('name', 'друг')
@@ -239,8 +304,8 @@ async def cancel_reading(message: Message, state: FSMContext):
     )
 
 
-@router.message(ReadingStates.waiting_for_question)
-async def execute_reading(message: Message, state: FSMContext, db):
+@router.message(ReadingStates.waiting_for_question, flags={"reading": "question"})
+async def execute_reading(message: Message, state: FSMContext, db, user: Optional[Dict] = None):
     """Execute reading based on type (one question or 3-card spread)"""
     user_id = message.from_user.id
     question = message.text.strip()
@@ -275,7 +340,7 @@ async def execute_reading(message: Message, state: FSMContext, db):
     
     try:
         deck = TarotDeck()
-        interpreter = TarotInterpreter()
+        interpreter = TarotInterpreter(priority=reading_priority(reading_type, user))
         
         if reading_type == "deep_spread":
             # DEEP SPREAD (5, 7 cards or Deep Path)
@@ -285,7 +350,6 @@ async def execute_reading(message: Message, state: FSMContext, db):
             cards_count = 5 if spread_type == "5_cards" else 7
             
             cards = deck.draw_cards(cards_count)
-            interpretation = await interpreter.interpret_deep_spread(cards, spread_type, question)
             
             # Spread names
             spread_names = {
@@ -312,13 +376,17 @@ async def execute_reading(message: Message, state: FSMContext, db):
             
             cards_list_text = "\n".join(cards_names)
             
-            response = f"{spread_emoji} **{spread_name}**\n\n"
+            header = f"{spread_emoji} **{spread_name}**\n\n"
             if question_display != "Общее чтение":
-                response += f"📝 Вопрос: _{question_display}_\n\n"
-            response += f"**Карты расклада:**\n{cards_list_text}\n\n"
-            response += f"**Интерпретация:**\n\n{interpretation}"
+                header += f"📝 Вопрос: _{question_display}_\n\n"
+            header += f"**Карты расклада:**\n{cards_list_text}\n\n"
             
-            await message.answer(response, parse_mode="Markdown")
+            interpretation = await stream_to_message(
+                message,
+                header + "🔮 ...",
+                interpreter.stream_deep_spread(cards, spread_type, question),
+                lambda text: f"{header}**Интерпретация:**\n\n{text}"
+            )
             
             # Save to database
             await db.save_reading(
@@ -334,7 +402,6 @@ async def execute_reading(message: Message, state: FSMContext, db):
         elif reading_type == "one_question":
             # ONE CARD READING
             card = deck.draw_card()
-            interpretation = await interpreter.interpret_single_card(card, question)
             
             # Format response - new beautiful format
             is_reversed = card.get('is_reversed', False)
@@ -342,14 +409,20 @@ async def execute_reading(message: Message, state: FSMContext, db):
             card_name = f"{card['name_ru']}{reversed_text}"
             card_meaning = card['reversed'] if is_reversed else card['upright']
             
-            response = f"🔮 **Ответ на твой вопрос**\n\n"
-            response += f"📝 Вопрос: _{question_display}_\n\n"
-            response += f"**Аркан:** {card_name}\n"
-            response += f"**Смысл карты:** {card_meaning}\n\n"
-            response += f"**В контексте твоего вопроса карта говорит:**\n{interpretation}\n\n"
-            response += f"✨ Пусть ясность придёт легко и вовремя"
+            header = f"🔮 **Ответ на твой вопрос**\n\n"
+            header += f"📝 Вопрос: _{question_display}_\n\n"
+            header += f"**Аркан:** {card_name}\n"
+            header += f"**Смысл карты:** {card_meaning}\n\n"
             
-            await message.answer(response, parse_mode="Markdown")
+            interpretation = await stream_to_message(
+                message,
+                header + "🔮 ...",
+                interpreter.stream_single_card(card, question),
+                lambda text: (
+                    f"{header}**В контексте твоего вопроса карта говорит:**\n{text}\n\n"
+                    f"✨ Пусть ясность придёт легко и вовремя"
+                )
+            )
             
             # Save to database
             await db.save_reading(
@@ -365,7 +438,6 @@ async def execute_reading(message: Message, state: FSMContext, db):
         else:
             # THREE CARD SPREAD
             cards = deck.draw_cards(3)
-            interpretation = await interpreter.interpret_three_card_spread(cards, question)
             
             # Format response - new beautiful format
             positions = ["Прошлое", "Настоящее", "Будущее"]
@@ -380,13 +452,19 @@ async def execute_reading(message: Message, state: FSMContext, db):
             
             cards_text = "\n\n".join(cards_list)
             
-            response = f"🌙 **Твой расклад из 3 карт**\n\n"
-            response += f"📝 Вопрос: _{question_display}_\n\n"
-            response += f"{cards_text}\n\n"
-            response += f"**Что это значит для тебя:**\n{interpretation}\n\n"
-            response += f"✨ Пусть твой путь будет ясным и защищённым"
+            header = f"🌙 **Твой расклад из 3 карт**\n\n"
+            header += f"📝 Вопрос: _{question_display}_\n\n"
+            header += f"{cards_text}\n\n"
             
-            await message.answer(response, parse_mode="Markdown")
+            interpretation = await stream_to_message(
+                message,
+                header + "🔮 ...",
+                interpreter.stream_three_card_spread(cards, question),
+                lambda text: (
+                    f"{header}**Что это значит для тебя:**\n{text}\n\n"
+                    f"✨ Пусть твой путь будет ясным и защищённым"
+                )
+            )
             
             # Save to database
             await db.save_reading(
@@ -399,6 +477,8 @@ async def execute_reading(message: Message, state: FSMContext, db):
             
             logger.info(f"3-card spread generated for user {user_id}")
         
+    except AdmissionRejected:
+        await reject_overloaded(message, db, reading_type, reply_markup=get_main_menu_keyboard())
     except Exception as e:
         logger.error(f"Error generating reading: {e}", exc_info=True)
         await message.answer(
@@ -407,18 +487,17 @@ async def execute_reading(message: Message, state: FSMContext, db):
         )
 
 
-@router.message(F.text == "⭐ Совет Таро")
-async def tarot_advice(message: Message, db):
+@router.message(F.text == "⭐ Совет Таро", flags={"reading": "tarot_advice"})
+async def tarot_advice(message: Message, db, user: Optional[Dict] = None):
     """Give instant tarot advice"""
     user_id = message.from_user.id
-    user = await db.get_user(user_id)
     
     if not user:
         await message.answer("Сначала нужно зарегистрироваться. Нажми /start")
         return
     
     # Check limits
-    if not await check_limits(message, db, "tarot_advice"):
+    if not await check_limits(message, db, "tarot_advice", user):
         return
     
     name = user.get('name', 'друг')
@@ -431,21 +510,25 @@ async def tarot_advice(message: Message, db):
         deck = TarotDeck()
         card = deck.draw_card()
         
-        # Generate interpretation as advice
-        interpreter = TarotInterpreter()
-        interpretation = await interpreter.interpret_single_card(card, question="Какой совет карты могут дать мне прямо сейчас?")
-        
         # Format response
         is_reversed = card.get('is_reversed', False)
         reversed_text = " (перевёрнутая)" if is_reversed else ""
         card_name = f"{card['name_ru']}{reversed_text}"
         
-        response = f"⭐ **Совет Таро на сейчас**\n\n"
-        response += f"**Карта:** {card_name}\n\n"
-        response += f"**Послание карты:**\n{interpretation}\n\n"
-        response += f"🌙 Пусть этот совет поддержит тебя в нужный момент"
+        header = f"⭐ **Совет Таро на сейчас**\n\n"
+        header += f"**Карта:** {card_name}\n\n"
         
-        await message.answer(response, parse_mode="Markdown")
+        # Generate interpretation as advice
+        interpreter = TarotInterpreter(priority=reading_priority("tarot_advice", user))
+        interpretation = await stream_to_message(
+            message,
+            header + "🔮 ...",
+            interpreter.stream_single_card(card, question=ADVICE_QUESTION),
+            lambda text: (
+                f"{header}**Послание карты:**\n{text}\n\n"
+                f"🌙 Пусть этот совет поддержит тебя в нужный момент"
+            )
+        )
         
         # Save to database
         await db.save_reading(
@@ -458,6 +541,8 @@ async def tarot_advice(message: Message, db):
         
         logger.info(f"Tarot advice generated for user {user_id}: {card['name_ru']}")
         
+    except AdmissionRejected:
+        await reject_overloaded(message, db, "tarot_advice")
     except Exception as e:
         logger.error(f"Error generating tarot advice: {e}")
         await message.answer(
@@ -466,10 +551,9 @@ async def tarot_advice(message: Message, db):
 
 
 @router.message(F.text == "📖 История чтений")
-async def my_history(message: Message, db):
+async def my_history(message: Message, db, user: Optional[Dict] = None):
     """Show user's reading history"""
     user_id = message.from_user.id
-    user = await db.get_user(user_id)
     
     if not user:
         await message.answer("Сначала нужно зарегистрироваться. Нажми /start")
@@ -518,18 +602,17 @@ async def my_history(message: Message, db):
     await message.answer(response, parse_mode="Markdown")
 
 
-@router.message(F.text == "🔥 Глубокий расклад")
-async def deep_spread_start(message: Message, state: FSMContext, db):
+@router.message(F.text == "🔥 Глубокий расклад", flags={"reading": "deep_spread", "opens_flow": True})
+async def deep_spread_start(message: Message, state: FSMContext, db, user: Optional[Dict] = None):
     """Start deep spread - choose type"""
     user_id = message.from_user.id
-    user = await db.get_user(user_id)
     
     if not user:
         await message.answer("Сначала нужно зарегистрироваться. Нажми /start")
         return
     
     # Check limits - PREMIUM ONLY
-    if not await check_limits(message, db, "deep_spread"):
+    if not await check_limits(message, db, "deep_spread", user):
         return
     
     name = user.get('name', 'друг')
@@ -593,18 +676,17 @@ async def deep_spread_invalid_choice(message: Message, state: FSMContext):
     )
 
 
-@router.message(F.text == "💫 Моя энергетика")
-async def personal_energy(message: Message, db):
+@router.message(F.text == "💫 Моя энергетика", flags={"reading": "personal_energy"})
+async def personal_energy(message: Message, db, user: Optional[Dict] = None):
     """Read user's personal energy"""
     user_id = message.from_user.id
-    user = await db.get_user(user_id)
     
     if not user:
         await message.answer("Сначала нужно зарегистрироваться. Нажми /start")
         return
     
     # Check limits - PREMIUM ONLY
-    if not await check_limits(message, db, "personal_energy"):
+    if not await check_limits(message, db, "personal_energy", user):
         return
     
     name = user.get('name', 'друг')
@@ -613,7 +695,7 @@ async def personal_energy(message: Message, db):
     
     try:
         # Generate energy reading
-        interpreter = TarotInterpreter()
+        interpreter = TarotInterpreter(priority=reading_priority("personal_energy", user))
         interpretation, cards = await interpreter.interpret_personal_energy(user)
         
         # Format cards
@@ -641,6 +723,8 @@ async def personal_energy(message: Message, db):
         
         logger.info(f"Personal energy reading for user {user_id}")
         
+    except AdmissionRejected:
+        await reject_overloaded(message, db, "personal_energy")
     except Exception as e:
         logger.error(f"Error generating energy reading: {e}", exc_info=True)
         await message.answer(
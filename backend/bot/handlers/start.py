@@ -238,8 +238,8 @@ async def callback_check_subscription(callback: CallbackQuery, state: FSMContext
     """Handle 'I subscribed' button click"""
     user_id = callback.from_user.id
     
-    # Check subscription again
-    is_subscribed = await check_user_subscribed(bot, user_id)
+    # Check subscription again, bypassing the cached "not subscribed" answer
+    is_subscribed = await check_user_subscribed(bot, user_id, force=True)
     
     if is_subscribed:
         # User subscribed - allow access
@@ -0,0 +1,132 @@
+"""Progressive delivery of streamed interpretations through message edits"""
+import asyncio
+import time
+import logging
+from typing import AsyncIterator, Callable, List, Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+# Telegram tolerates roughly one edit per second per chat; stay below that
+EDIT_INTERVAL = 1.5
+# Don't spend an edit on a couple of new characters
+MIN_EDIT_CHARS = 40
+MAX_MESSAGE_LENGTH = 4096
+STREAM_CURSOR = " ▌"
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Split long text into Telegram-sized parts, preferring paragraph breaks"""
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    parts.append(text)
+    return parts
+
+
+async def _edit(sent: Message, text: str, parse_mode: Optional[str]):
+    """Edit message, falling back to plain text if partial Markdown can't be parsed"""
+    try:
+        await sent.edit_text(text, parse_mode=parse_mode)
+    except TelegramBadRequest as e:
+        error = str(e).lower()
+        if "not modified" in error:
+            return
+        if parse_mode and "parse" in error:
+            await sent.edit_text(text, parse_mode=None)
+            return
+        raise
+
+
+async def _answer(message: Message, text: str, parse_mode: Optional[str]):
+    """Send a message, falling back to plain text if its Markdown can't be parsed"""
+    try:
+        await message.answer(text, parse_mode=parse_mode)
+    except TelegramBadRequest as e:
+        if parse_mode and "parse" in str(e).lower():
+            # A split can fall inside a **…** span
+            await message.answer(text, parse_mode=None)
+            return
+        raise
+
+
+async def _delete(sent: Message):
+    try:
+        await sent.delete()
+    except TelegramBadRequest as e:
+        logger.warning(f"Could not delete stream placeholder: {e}")
+
+
+async def stream_to_message(
+    message: Message,
+    placeholder: str,
+    deltas: AsyncIterator[str],
+    render: Callable[[str], str],
+    parse_mode: Optional[str] = "Markdown"
+) -> str:
+    """
+    Send a placeholder and progressively edit it with streamed text
+
+    Args:
+        message: Incoming message to answer
+        placeholder: Text shown until the first deltas arrive
+        deltas: Async iterator of interpretation text deltas
+        render: Builds the full message text from the interpretation so far
+        parse_mode: Parse mode of the rendered message
+
+    Returns:
+        str: Full interpretation text
+    """
+    sent = await message.answer(placeholder, parse_mode=parse_mode)
+
+    chunks = []
+    length = 0
+    shown_length = 0
+    next_edit_at = 0.0
+
+    try:
+        async for delta in deltas:
+            chunks.append(delta)
+            length += len(delta)
+
+            now = time.monotonic()
+            if now < next_edit_at or length - shown_length < MIN_EDIT_CHARS:
+                continue
+
+            text = render("".join(chunks) + STREAM_CURSOR)[:MAX_MESSAGE_LENGTH]
+            try:
+                await _edit(sent, text, parse_mode)
+                shown_length = length
+                next_edit_at = time.monotonic() + EDIT_INTERVAL
+            except TelegramRetryAfter as e:
+                # Flood control: keep reading the stream, resume edits later
+                next_edit_at = now + e.retry_after
+            except TelegramBadRequest as e:
+                logger.warning(f"Skipping stream edit: {e}")
+                next_edit_at = now + EDIT_INTERVAL
+    except Exception:
+        if not chunks:
+            # Failed before the first token (e.g. shed by admission control); the caller
+            # reports it in its own message, so don't leave the placeholder behind
+            await _delete(sent)
+        raise
+
+    interpretation = "".join(chunks)
+    parts = split_message(render(interpretation))
+
+    try:
+        await _edit(sent, parts[0], parse_mode)
+    except TelegramRetryAfter as e:
+        await asyncio.sleep(e.retry_after)
+        await _edit(sent, parts[0], parse_mode)
+
+    for part in parts[1:]:
+        await _answer(message, part, parse_mode)
+
+    return interpretation
@@ -0,0 +1,163 @@
+"""Aiogram middlewares shared by the bot routers"""
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.fsm.state import State
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+
+from backend.cache import TTLCache
+from backend.metrics import (
+    HANDLER_ERRORS,
+    HANDLER_SECONDS,
+    TELEGRAM_REQUEST_ERRORS,
+    TELEGRAM_REQUEST_SECONDS,
+    registry,
+)
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+class UserMiddleware(BaseMiddleware):
+    """
+    Load the user document once per update
+
+    The document is put into handler data as `user` (None for unregistered
+    users), so handlers and Database calls share one lookup.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        db = data.get("db")
+        from_user = data.get("event_from_user")
+        if db is not None and from_user is not None and "user" not in data:
+            data["user"] = await db.get_user(from_user.id)
+        return await handler(event, data)
+
+
+READINGS_GUARDED = registry.counter("tarot_readings_guarded_total", "Reading requests that passed the in-flight guard")
+READINGS_COALESCED = registry.counter(
+    "tarot_readings_coalesced_total", "Reading requests dropped because one was already running for the user"
+)
+
+# Finished readings are remembered this long to spot taps that were queued behind them
+FINISHED_READINGS_TTL = 600
+FINISHED_READINGS_SIZE = 100000
+
+# Answer to a reading request while the previous one is still running
+READING_IN_PROGRESS_TEXT = "🔮 Уже тяну карты… Дождись ответа на предыдущий запрос."
+# Answer to a second start of a reading that is still waiting for the user's question
+READING_PENDING_TEXT = "🔮 Я уже жду твой вопрос для начатого расклада. Напиши его или нажми «❌ Отменить»."
+
+
+class ReadingGuardMiddleware(BaseMiddleware):
+    """
+    Allow one reading per user at a time
+
+    Handlers flagged with `flags={"reading": "<type>"}` are single-flight
+    per user: while one runs, further flagged requests of that user get a
+    short notice instead of a second LLM call, message and limit check.
+    The registry is per process; with webhook workers a user's updates
+    always reach the same one. Those workers run a user's updates one after
+    another and pass `received_at` (time.monotonic() when the update was
+    taken off the queue), so a tap that waited behind a reading which
+    finished after it arrived is recognised as a duplicate as well.
+
+    Handlers that only open a flow (consume the limit, then ask for the
+    question) are also flagged `"opens_flow": True`; for them a user in one
+    of `pending_states` counts as in flight too, until the flow finishes.
+    """
+
+    def __init__(self, pending_states: Iterable[State] = ()):
+        self._in_flight: Dict[int, str] = {}
+        # user id -> (monotonic time, reading) of the user's last finished reading
+        self._finished = TTLCache(maxsize=FINISHED_READINGS_SIZE, ttl=FINISHED_READINGS_TTL)
+        self._pending_states = {state.state for state in pending_states}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        reading = get_flag(data, "reading")
+        from_user = data.get("event_from_user")
+        if not reading or from_user is None:
+            return await handler(event, data)
+
+        running = self._in_flight.get(from_user.id)
+        received_at = data.get("received_at")
+        if running is None and received_at is not None:
+            finished = self._finished.get(from_user.id)
+            if finished is not None and finished[0] > received_at:
+                running = finished[1]
+        if running is not None:
+            READINGS_COALESCED.inc(reading=reading, running=running)
+            await event.answer(READING_IN_PROGRESS_TEXT)
+            return None
+
+        # Marked before the state lookup, which awaits and would let a concurrent tap through
+        self._in_flight[from_user.id] = reading
+        try:
+            if get_flag(data, "opens_flow") and self._pending_states:
+                state = data.get("state")
+                if state is not None and await state.get_state() in self._pending_states:
+                    READINGS_COALESCED.inc(reading=reading, running="pending_flow")
+                    await event.answer(READING_PENDING_TEXT)
+                    return None
+
+            READINGS_GUARDED.inc(reading=reading)
+            return await handler(event, data)
+        finally:
+            del self._in_flight[from_user.id]
+            self._finished.set(from_user.id, (time.monotonic(), reading))
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Record duration and failures of the router's handlers, labelled by handler name"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object is not None else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            HANDLER_ERRORS.inc(handler=name, error=type(e).__name__)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, handler=name)
+
+
+class RequestMetricsMiddleware(BaseRequestMiddleware):
+    """Record duration and failures of Bot API requests (message.answer, edits, ...) by method"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            TELEGRAM_REQUEST_ERRORS.inc(method=name, error=type(e).__name__)
+            raise
+        finally:
+            TELEGRAM_REQUEST_SECONDS.observe(time.perf_counter() - started, method=name)
@@ -1,14 +1,98 @@
 """Subscription check middleware and helper functions"""
-from aiogram import Bot
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, Message, TelegramObject
 import logging
 
+from backend.cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
 REQUIRED_CHANNEL = "@taro209"  # Channel username with @
 
+# Subscribers rarely leave, so positive answers live much longer
+SUBSCRIBED_TTL = 30 * 60
+NOT_SUBSCRIBED_TTL = 30
+# Errors fall back to "allowed"; cache that briefly so outages don't hammer the API
+ERROR_TTL = 60
+CACHE_SIZE = 50000
 
-async def check_user_subscribed(bot: Bot, user_id: int, channel: str = REQUIRED_CHANNEL) -> bool:
+
+class SubscriptionCache:
+    """
+    TTL cache of channel membership with single-flight lookups
+    
+    Concurrent checks for the same (channel, user) share one
+    get_chat_member call. It runs in its own task, so a cancelled caller
+    (e.g. the one that started it) doesn't cancel it for the others.
+    """
+    
+    def __init__(self, subscribed_ttl: float = SUBSCRIBED_TTL, not_subscribed_ttl: float = NOT_SUBSCRIBED_TTL,
+                 error_ttl: float = ERROR_TTL, maxsize: int = CACHE_SIZE):
+        self.subscribed_ttl = subscribed_ttl
+        self.not_subscribed_ttl = not_subscribed_ttl
+        self.error_ttl = error_ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=subscribed_ttl)
+        self._in_flight: Dict[Tuple[str, int], asyncio.Task] = {}
+    
+    async def is_subscribed(self, bot: Bot, user_id: int, channel: str = REQUIRED_CHANNEL,
+                            force: bool = False) -> bool:
+        """Cached subscription check; `force` skips the cache but still refreshes it"""
+        key = (channel, user_id)
+        if not force:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+        
+        while True:
+            lookup = self._in_flight.get(key)
+            if lookup is None:
+                lookup = asyncio.create_task(self._lookup(bot, user_id, channel))
+                self._in_flight[key] = lookup
+                lookup.add_done_callback(lambda done: self._lookup_done(key, done))
+            try:
+                return await asyncio.shield(lookup)
+            except asyncio.CancelledError:
+                if not lookup.cancelled():
+                    raise
+                # The lookup itself was cancelled, not this caller: start a new one
+    
+    async def _lookup(self, bot: Bot, user_id: int, channel: str) -> bool:
+        is_subscribed, ttl = await self._fetch(bot, user_id, channel)
+        self._cache.set((channel, user_id), is_subscribed, ttl=ttl)
+        return is_subscribed
+    
+    def _lookup_done(self, key: Tuple[str, int], lookup: asyncio.Task):
+        if self._in_flight.get(key) is lookup:
+            del self._in_flight[key]
+        if not lookup.cancelled():
+            # Every waiter may have been cancelled; don't leave an unretrieved exception behind
+            lookup.exception()
+    
+    def invalidate(self, user_id: int, channel: str = REQUIRED_CHANNEL):
+        self._cache.pop((channel, user_id))
+    
+    async def _fetch(self, bot: Bot, user_id: int, channel: str) -> Tuple[bool, float]:
+        try:
+            member = await bot.get_chat_member(chat_id=channel, user_id=user_id)
+        except Exception as e:
+            logger.error(f"Error checking subscription for user {user_id}: {e}")
+            # In case of error (e.g., bot not admin in channel), allow access
+            return True, self.error_ttl
+        
+        # Check if user is member, administrator or creator
+        if member.status in ['member', 'administrator', 'creator']:
+            return True, self.subscribed_ttl
+        return False, self.not_subscribed_ttl
+
+
+subscription_cache = SubscriptionCache()
+
+
+async def check_user_subscribed(bot: Bot, user_id: int, channel: str = REQUIRED_CHANNEL,
+                                force: bool = False) -> bool:
     """
     Check if user is subscribed to the required channel
     
@@ -16,18 +100,48 @@ async def check_user_subscribed(bot: Bot, user_id: int, channel: str = REQUIRED_
         bot: Bot instance
         user_id: User's Telegram ID
         channel: Channel username (e.g., @taro209)
+        force: Ask Telegram even if a cached answer exists
     
     Returns:
         True if user is subscribed, False otherwise
     """
-    try:
-        member = await bot.get_chat_member(chat_id=channel, user_id=user_id)
-        # Check if user is member, administrator or creator
-        return member.status in ['member', 'administrator', 'creator']
-    except Exception as e:
-        logger.error(f"Error checking subscription for user {user_id}: {e}")
-        # In case of error (e.g., bot not admin in channel), allow access
-        return True
+    return await subscription_cache.is_subscribed(bot, user_id, channel, force=force)
+
+
+class SubscriptionMiddleware(BaseMiddleware):
+    """
+    Gate handlers behind channel subscription
+    
+    Unsubscribed users get the subscription message instead of the handler.
+    Register it on routers that should require a subscription, e.g.
+    `router.message.middleware(SubscriptionMiddleware())`.
+    """
+    
+    def __init__(self, channel: str = REQUIRED_CHANNEL):
+        self.channel = channel
+    
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        bot = data.get("bot")
+        if from_user is None or bot is None:
+            return await handler(event, data)
+        
+        if await check_user_subscribed(bot, from_user.id, self.channel):
+            return await handler(event, data)
+        
+        text = SUBSCRIPTION_MESSAGE.format(channel=self.channel)
+        keyboard = get_subscription_keyboard(self.channel)
+        if isinstance(event, Message):
+            await event.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+        elif isinstance(event, CallbackQuery) and event.message:
+            await event.answer()
+            await event.message.answer(text, reply_markup=keyboard, parse_mode="Markdown")
+        logger.info(f"User {from_user.id} blocked by subscription gate for {self.channel}")
 
 
 def get_subscription_keyboard(channel: str = REQUIRED_CHANNEL) -> InlineKeyboardMarkup:
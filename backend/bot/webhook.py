@@ -0,0 +1,256 @@
+"""
+Webhook mode: one ingress process, updates sharded over worker processes
+
+The ingress answers Telegram with 200 as soon as an update is queued; it
+never runs handlers. Each update goes to worker `user_id % workers`, so
+one user's updates are always handled by the same process (and in
+order), while different users are spread over all cores.
+
+    python -m backend.bot.webhook
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+
+from backend import metrics
+from backend.config import config
+from backend.database import Database
+from backend.bot.fsm_storage import MongoFSMStorage
+
+logger = logging.getLogger(__name__)
+
+# Only update types some handler reacts to; setWebhook asks Telegram for these alone
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+# Parallel webhook connections Telegram may open
+WEBHOOK_MAX_CONNECTIONS = 100
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", str(os.cpu_count() or 1)))
+# Updates waiting per worker; beyond that the ingress answers 503 and Telegram retries later
+WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "10000"))
+# Updates handled at once by one worker
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "256"))
+# Updates a worker takes off its queue before earlier ones finish (running or waiting behind the same user)
+WORKER_BACKLOG = int(os.getenv("WORKER_BACKLOG", str(4 * WORKER_CONCURRENCY)))
+# Updates of one user waiting in a worker; more are dropped
+WORKER_USER_BACKLOG = int(os.getenv("WORKER_USER_BACKLOG", "20"))
+# FSM cache of a worker; safe here because a user's updates always reach the same worker
+WORKER_FSM_CACHE_TTL = float(os.getenv("WORKER_FSM_CACHE_TTL", "30"))
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+WEBHOOK_UPDATES = metrics.registry.counter("tarot_webhook_updates_total", "Webhook updates by outcome")
+
+DispatcherFactory = Callable[[], Awaitable[Tuple[Bot, Dispatcher]]]
+
+
+def update_type(update: Dict) -> Optional[str]:
+    return next((key for key in update if key != "update_id"), None)
+
+
+def update_user_id(update: Dict) -> int:
+    """Id of the user an update belongs to; falls back to the chat, then the update id"""
+    payload = update.get(update_type(update)) or {}
+    if not isinstance(payload, dict):
+        return update.get("update_id", 0)
+    user = payload.get("from") or payload.get("user")
+    if user:
+        return user["id"]
+    chat = payload.get("chat") or (payload.get("message") or {}).get("chat")
+    if chat:
+        return chat["id"]
+    return update.get("update_id", 0)
+
+
+async def build_dispatcher() -> Tuple[Bot, Dispatcher]:
+    """Bot and dispatcher of one worker: both routers, shared database, cached Mongo FSM storage"""
+    from backend.bot.handlers import readings, start
+
+    bot = Bot(token=config.TELEGRAM_BOT_TOKEN)
+    db = Database(config.MONGO_URL, config.DB_NAME, user_cache_ttl=config.USER_CACHE_TTL)
+    dp = Dispatcher(storage=MongoFSMStorage(db, cache_ttl=WORKER_FSM_CACHE_TTL), db=db)
+    dp.include_routers(start.router, readings.router)
+    return bot, dp
+
+
+def run_worker(index: int, updates: multiprocessing.Queue, dispatcher_factory: DispatcherFactory):
+    """Worker process entry point"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker-{index} - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stdout
+    )
+    # Every worker serves its own /metrics, on the ports after the ingress one
+    if metrics.METRICS_PORT:
+        metrics.METRICS_PORT += 1 + index
+    asyncio.run(_worker_main(index, updates, dispatcher_factory))
+
+
+async def _worker_main(index: int, updates: multiprocessing.Queue, dispatcher_factory: DispatcherFactory):
+    bot, dp = await dispatcher_factory()
+    await dp.emit_startup(bot=bot, **dp.workflow_data)
+    logger.info(f"Worker {index} ready")
+
+    # Updates running handlers; taken only once the user's previous update is done,
+    # so updates waiting behind their user never hold one
+    slots = asyncio.Semaphore(WORKER_CONCURRENCY)
+    backlog = asyncio.Semaphore(WORKER_BACKLOG)
+    # Last queued task per user; the next update of that user waits for it
+    tails: Dict[int, asyncio.Task] = {}
+    # Updates per user taken off the queue and not finished yet
+    pending: Dict[int, int] = {}
+
+    async def process(update: Dict, received_at: float, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            await asyncio.wait([previous])
+        async with slots:
+            try:
+                # received_at lets ReadingGuardMiddleware drop taps that arrived while a reading ran
+                await dp.feed_raw_update(bot, update, received_at=received_at)
+            except Exception as e:
+                logger.error(f"Update {update.get('update_id')} failed: {e}", exc_info=True)
+
+    def finished(user_id: int, task: asyncio.Task):
+        backlog.release()
+        pending[user_id] -= 1
+        if not pending[user_id]:
+            del pending[user_id]
+        if tails.get(user_id) is task:
+            del tails[user_id]
+
+    try:
+        while True:
+            # Waiting for room first leaves the backlog in the queue, where the ingress sees it
+            await backlog.acquire()
+            body = await asyncio.to_thread(updates.get)
+            if body is None:
+                backlog.release()
+                break
+            update = json.loads(body)
+            user_id = update_user_id(update)
+            if pending.get(user_id, 0) >= WORKER_USER_BACKLOG:
+                backlog.release()
+                WEBHOOK_UPDATES.inc(outcome="dropped")
+                logger.warning(f"User {user_id} has {WORKER_USER_BACKLOG} updates waiting, "
+                               f"dropping update {update.get('update_id')}")
+                continue
+            pending[user_id] = pending.get(user_id, 0) + 1
+            task = asyncio.create_task(process(update, time.monotonic(), tails.get(user_id)))
+            tails[user_id] = task
+            task.add_done_callback(lambda done, user_id=user_id: finished(user_id, done))
+
+        if tails:
+            await asyncio.wait(list(tails.values()))
+    finally:
+        await dp.emit_shutdown(bot=bot, **dp.workflow_data)
+        await bot.session.close()
+        logger.info(f"Worker {index} stopped")
+
+
+def create_ingress_app(queues: List[multiprocessing.Queue], secret: str = WEBHOOK_SECRET,
+                       path: str = WEBHOOK_PATH) -> web.Application:
+    """aiohttp app that filters, shards and queues updates without handling them"""
+
+    async def receive(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+
+        body = await request.read()
+        try:
+            update = json.loads(body)
+        except ValueError:
+            WEBHOOK_UPDATES.inc(outcome="invalid")
+            return web.Response(status=400)
+
+        if update_type(update) not in ALLOWED_UPDATES:
+            WEBHOOK_UPDATES.inc(outcome="filtered")
+            return web.Response()
+
+        shard = update_user_id(update) % len(queues)
+        try:
+            queues[shard].put_nowait(body)
+        except queue.Full:
+            WEBHOOK_UPDATES.inc(outcome="rejected")
+            logger.warning(f"Worker {shard} queue is full, Telegram will resend update {update.get('update_id')}")
+            return web.Response(status=503)
+
+        WEBHOOK_UPDATES.inc(outcome="queued")
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(path, receive)
+    return app
+
+
+async def _serve(queues: List[multiprocessing.Queue]):
+    metrics_runner = await metrics.start_metrics_server()
+    runner = web.AppRunner(create_ingress_app(queues), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    logger.info(f"Webhook ingress listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    if WEBHOOK_URL:
+        bot = Bot(token=config.TELEGRAM_BOT_TOKEN)
+        try:
+            await bot.set_webhook(
+                url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                allowed_updates=ALLOWED_UPDATES,
+                secret_token=WEBHOOK_SECRET or None,
+                max_connections=WEBHOOK_MAX_CONNECTIONS
+            )
+            logger.info(f"Webhook set to {WEBHOOK_URL}{WEBHOOK_PATH}")
+        finally:
+            await bot.session.close()
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
+
+def run_webhook(dispatcher_factory: DispatcherFactory = build_dispatcher, workers: int = WEBHOOK_WORKERS):
+    """Start the workers and serve the webhook until interrupted"""
+    context = multiprocessing.get_context("spawn")
+    queues = [context.Queue(maxsize=WORKER_QUEUE_SIZE) for _ in range(workers)]
+    processes = [
+        context.Process(target=run_worker, args=(index, updates, dispatcher_factory), name=f"bot-worker-{index}")
+        for index, updates in enumerate(queues)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(f"Started {workers} worker processes")
+
+    try:
+        asyncio.run(_serve(queues))
+    except KeyboardInterrupt:
+        logger.info("Shutting down webhook ingress...")
+    finally:
+        # Workers finish what is queued, then stop
+        for updates in queues:
+            updates.put(None)
+        for process in processes:
+            process.join(timeout=60)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - ingress - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stdout
+    )
+    run_webhook()
@@ -0,0 +1,371 @@
+"""RSS/Atom news ingestion with a local SQLite cache"""
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Feeds per NewsFetcher topic; topics without feeds fall back to web search
+FEEDS: Dict[str, List[str]] = {
+    "space": [
+        "https://www.nasa.gov/news-release/feed/",
+        "https://www.space.com/feeds/all",
+        "https://www.esa.int/rssfeed/Our_Activities/Space_News",
+    ],
+    "science": [
+        "https://www.sciencedaily.com/rss/top/science.xml",
+        "https://phys.org/rss-feed/",
+        "https://nplus1.ru/rss",
+    ],
+    "technology": [
+        "https://habr.com/ru/rss/news/",
+        "https://www.technologyreview.com/feed/",
+    ],
+    "nature": [
+        "https://www.sciencedaily.com/rss/earth_climate.xml",
+        "https://www.sciencedaily.com/rss/plants_animals.xml",
+    ],
+}
+
+FETCH_TIMEOUT = 20
+MAX_CONCURRENT_FETCHES = 8
+FETCH_CHUNK_SIZE = 16 * 1024
+# Only news from the last day is used for posts
+ITEM_FRESHNESS = timedelta(hours=24)
+# Reading a feed stops once this many fresh items were seen
+MAX_FRESH_ITEMS_PER_FEED = 10
+# Items older than this are dropped from the cache
+ITEM_RETENTION_DAYS = 7
+SUMMARY_MAX_CHARS = 500
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+RSS_ITEM = "item"
+ATOM_ENTRY = f"{ATOM_NS}entry"
+# Children of an item that are kept while it is being parsed; everything else is dropped
+ITEM_FIELDS = frozenset([
+    "title", "link", "description", "pubDate",
+    f"{ATOM_NS}title", f"{ATOM_NS}link", f"{ATOM_NS}summary", f"{ATOM_NS}content",
+    f"{ATOM_NS}published", f"{ATOM_NS}updated",
+])
+
+
+def url_hash(url: str) -> str:
+    """Dedup key of a news item"""
+    return hashlib.sha1(url.strip().encode("utf-8")).hexdigest()
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse RSS (RFC 822) or Atom (ISO 8601) dates into aware UTC datetimes"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def to_iso(value: datetime) -> str:
+    """Fixed-width UTC timestamp, so stored dates compare correctly as text"""
+    return value.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+
+def _text(element: Optional[ET.Element]) -> str:
+    return (element.text or "").strip() if element is not None else ""
+
+
+def _rss_item(item: ET.Element) -> Dict:
+    return {
+        "title": _text(item.find("title")),
+        "link": _text(item.find("link")),
+        "summary": _text(item.find("description"))[:SUMMARY_MAX_CHARS],
+        "published": parse_date(_text(item.find("pubDate"))),
+    }
+
+
+def _atom_entry(entry: ET.Element) -> Dict:
+    link = entry.find(f"{ATOM_NS}link")
+    summary = entry.find(f"{ATOM_NS}summary")
+    if summary is None:
+        summary = entry.find(f"{ATOM_NS}content")
+    published = entry.find(f"{ATOM_NS}published")
+    if published is None:
+        published = entry.find(f"{ATOM_NS}updated")
+    return {
+        "title": _text(entry.find(f"{ATOM_NS}title")),
+        "link": link.get("href", "") if link is not None else "",
+        "summary": _text(summary)[:SUMMARY_MAX_CHARS],
+        "published": parse_date(_text(published)),
+    }
+
+
+class FeedStreamParser:
+    """
+    Incremental RSS/Atom parser fed with chunks of the response body
+
+    Each item is turned into a small dict as soon as its closing tag
+    arrives and is then detached from the tree, so memory grows with the
+    number of kept items rather than the document size. With `since`,
+    older items are skipped; with `max_items`, `done` is set once that
+    many fresh items were seen and the rest of the document can be
+    left unread.
+    """
+
+    def __init__(self, since: Optional[datetime] = None, max_items: Optional[int] = None):
+        self.since = since
+        self.max_items = max_items
+        self.seen = 0
+        self.done = False
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._stack: List[ET.Element] = []
+        self._item_depth = 0
+
+    def feed(self, chunk: bytes) -> List[Dict]:
+        """Parse another chunk; returns the items it completed"""
+        self._parser.feed(chunk)
+        return list(self._read_items())
+
+    def close(self) -> List[Dict]:
+        """Finish a fully read document"""
+        self._parser.close()
+        return list(self._read_items())
+
+    def _read_items(self) -> Iterator[Dict]:
+        for event, element in self._parser.read_events():
+            if event == "start":
+                self._stack.append(element)
+                if element.tag in (RSS_ITEM, ATOM_ENTRY):
+                    self._item_depth += 1
+                continue
+
+            self._stack.pop()
+            if element.tag in (RSS_ITEM, ATOM_ENTRY):
+                self._item_depth -= 1
+                item = _rss_item(element) if element.tag == RSS_ITEM else _atom_entry(element)
+                # Detach the finished item so the tree never holds the whole feed
+                if self._stack:
+                    self._stack[-1].remove(element)
+                if self._keep(item):
+                    yield item
+            elif self._item_depth and element.tag not in ITEM_FIELDS:
+                # Full-text bodies, media blocks etc. are never used
+                element.clear()
+
+    def _keep(self, item: Dict) -> bool:
+        if self.done or not (item["link"] and item["title"]):
+            return False
+        # Items without a date count as fresh, like in FeedCache.add_items
+        if self.since is not None and item["published"] is not None and item["published"] < self.since:
+            return False
+        self.seen += 1
+        if self.max_items is not None and self.seen >= self.max_items:
+            self.done = True
+        return True
+
+
+def parse_feed(payload: bytes) -> List[Dict]:
+    """Parse a whole RSS or Atom document into items"""
+    parser = FeedStreamParser()
+    return parser.feed(payload) + parser.close()
+
+
+class FeedCache:
+    """
+    SQLite cache of parsed news items and per-feed HTTP validators
+
+    Methods are blocking; async callers run them with asyncio.to_thread.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS items (
+                    url_hash TEXT PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    summary TEXT,
+                    link TEXT NOT NULL,
+                    published TEXT,
+                    fetched_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS items_topic_published ON items (topic, published);
+                CREATE TABLE IF NOT EXISTS feeds (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    checked_at TEXT
+                );
+            """)
+
+    def get_validators(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        """ETag and Last-Modified of the last successful fetch"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM feeds WHERE url = ?", (url,)
+            ).fetchone()
+        return row if row else (None, None)
+
+    def set_validators(self, url: str, etag: Optional[str], last_modified: Optional[str]):
+        now = to_iso(datetime.now(timezone.utc))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds (url, etag, last_modified, checked_at) VALUES (?, ?, ?, ?)",
+                (url, etag, last_modified, now)
+            )
+
+    def add_items(self, topic: str, items: List[Dict]) -> int:
+        """Store items, skipping URLs already cached; returns number of new items"""
+        now = datetime.now(timezone.utc)
+        rows = [
+            (
+                url_hash(item["link"]),
+                topic,
+                item["title"],
+                item.get("summary", ""),
+                item["link"],
+                to_iso(item.get("published") or now),
+                to_iso(now)
+            )
+            for item in items
+        ]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO items (url_hash, topic, title, summary, link, published, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return self._conn.total_changes - before
+
+    def recent_items(self, topic: str, since: datetime, limit: int = 5) -> List[Dict]:
+        """Newest cached items of a topic published after `since`"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, summary, link, published FROM items "
+                "WHERE topic = ? AND published >= ? ORDER BY published DESC LIMIT ?",
+                (topic, to_iso(since), limit)
+            ).fetchall()
+        return [
+            {"title": title, "summary": summary, "link": link, "published": published}
+            for title, summary, link, published in rows
+        ]
+
+    def prune(self, before: datetime) -> int:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM items WHERE published < ?",
+                (to_iso(before),)
+            )
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FeedIngestor:
+    """
+    Fetches all configured feeds concurrently into a FeedCache
+
+    Uses one pooled aiohttp session and conditional GET, so unchanged
+    feeds cost a 304 and no parsing. Bodies are parsed while they
+    download and the download stops once enough fresh items were seen.
+    """
+
+    def __init__(self, cache: FeedCache, feeds: Dict[str, List[str]] = None,
+                 max_concurrent: int = MAX_CONCURRENT_FETCHES, timeout: float = FETCH_TIMEOUT,
+                 max_items_per_feed: int = MAX_FRESH_ITEMS_PER_FEED):
+        self.cache = cache
+        self.feeds = feeds if feeds is not None else FEEDS
+        self.max_items_per_feed = max_items_per_feed
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._fetch_slots = asyncio.Semaphore(max_concurrent)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=MAX_CONCURRENT_FETCHES, ttl_dns_cache=300),
+                timeout=self.timeout,
+                headers={"User-Agent": "tarot-channel-poster/1.0 (+https://t.me/taro209)"}
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def ingest(self) -> int:
+        """Fetch every feed once; returns number of new items cached"""
+        jobs = [
+            self.fetch_feed(topic, url)
+            for topic, urls in self.feeds.items()
+            for url in urls
+        ]
+        new_items = sum(await asyncio.gather(*jobs))
+
+        cutoff = datetime.now(timezone.utc) - timedelta(days=ITEM_RETENTION_DAYS)
+        pruned = await asyncio.to_thread(self.cache.prune, cutoff)
+        logger.info(f"📰 Feed ingestion done: {new_items} new items, {pruned} expired")
+        return new_items
+
+    async def fetch_feed(self, topic: str, url: str) -> int:
+        """Fetch one feed with conditional GET and cache its items"""
+        async with self._fetch_slots:
+            try:
+                etag, last_modified = await asyncio.to_thread(self.cache.get_validators, url)
+                headers = {}
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+
+                parser = FeedStreamParser(
+                    since=datetime.now(timezone.utc) - ITEM_FRESHNESS,
+                    max_items=self.max_items_per_feed
+                )
+                items = []
+
+                session = await self._get_session()
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304:
+                        logger.debug(f"Feed not modified: {url}")
+                        return 0
+                    response.raise_for_status()
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+
+                    async for chunk in response.content.iter_chunked(FETCH_CHUNK_SIZE):
+                        items.extend(parser.feed(chunk))
+                        if parser.done:
+                            break
+                    else:
+                        items.extend(parser.close())
+
+                added = await asyncio.to_thread(self.cache.add_items, topic, items)
+                await asyncio.to_thread(self.cache.set_validators, url, etag, last_modified)
+                logger.info(f"Feed {url}: {len(items)} items, {added} new")
+                return added
+            except Exception as e:
+                logger.error(f"Failed to fetch feed {url}: {e}")
+                return 0
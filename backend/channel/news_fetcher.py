@@ -1,6 +1,10 @@
+import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import random
+from typing import Dict, List, Optional
+
+from backend.channel.feeds import ITEM_FRESHNESS, FeedCache
 
 logger = logging.getLogger(__name__)
 
@@ -73,14 +77,23 @@ class NewsFetcher:
         ]
     }
     
-    def __init__(self, web_search_func):
+    # Search query of a topic that has no queries above (e.g. a channel's own topic)
+    CUSTOM_TOPIC_QUERY = "{topic} новости последние сутки"
+    
+    # Only news from the last day counts as fresh
+    FRESHNESS = ITEM_FRESHNESS
+    MAX_ITEMS = 5
+    
+    def __init__(self, web_search_func, feed_cache: Optional[FeedCache] = None):
         """
         Initialize news fetcher
         
         Args:
             web_search_func: Function to perform web searches
+            feed_cache: Cache filled by FeedIngestor; read instead of the network at post time
         """
         self.web_search = web_search_func
+        self.feed_cache = feed_cache
         self.last_topics = []  # Track to avoid repetition
     
     def get_random_topic(self) -> str:
@@ -101,16 +114,31 @@ class NewsFetcher:
         Fetch fresh news for a specific topic or random
         
         Args:
-            topic: Optional topic name (space, science, technology, nature, energy)
+            topic: Optional topic name: one of TOPICS or any topic a channel declares;
+                random built-in topic if omitted
             
         Returns:
             dict with 'topic', 'query', 'results'
         """
-        if topic is None or topic not in self.TOPICS:
+        if topic is None:
             topic = self.get_random_topic()
         
+        # Pre-fetched feed items are preferred over search
+        if self.feed_cache is not None:
+            items = await self._cached_items(topic)
+            if items:
+                logger.info(f"Using {len(items)} cached news items for topic '{topic}'")
+                return {
+                    "topic": topic,
+                    "query": "rss",
+                    "results": self.format_items(items),
+                    "items": items,
+                    "timestamp": datetime.now()
+                }
+        
         # Get random query for this topic
-        query = random.choice(self.TOPICS[topic])
+        queries = self.TOPICS.get(topic) or [self.CUSTOM_TOPIC_QUERY.format(topic=topic)]
+        query = random.choice(queries)
         
         logger.info(f"Fetching news for topic '{topic}' with query: {query}")
         
@@ -134,6 +162,25 @@ class NewsFetcher:
                 "timestamp": datetime.now()
             }
     
+    async def _cached_items(self, topic: str) -> List[Dict]:
+        since = datetime.now(timezone.utc) - self.FRESHNESS
+        try:
+            return await asyncio.to_thread(self.feed_cache.recent_items, topic, since, self.MAX_ITEMS)
+        except Exception as e:
+            logger.error(f"Error reading news cache: {e}")
+            return []
+    
+    @staticmethod
+    def format_items(items: List[Dict]) -> str:
+        """News items as prompt text"""
+        lines = []
+        for item in items:
+            line = f"- {item['title']}"
+            if item.get("summary"):
+                line += f": {item['summary']}"
+            lines.append(line)
+        return "\n".join(lines)
+    
     def get_topic_emoji(self, topic: str) -> str:
         """Get emoji for topic"""
         emoji_map = {
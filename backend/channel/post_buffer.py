@@ -0,0 +1,106 @@
+"""Durable buffer of pre-generated channel posts"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.channel.state_store import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+SLOT_KEY_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def slot_key(slot_time: datetime) -> str:
+    """Buffer key of a publication slot"""
+    return slot_time.strftime(SLOT_KEY_FORMAT)
+
+
+def upcoming_slot_times(now: datetime, slots: Iterable[Tuple[int, int]], horizon_hours: float) -> List[datetime]:
+    """All (hour, minute) slot occurrences between now and now + horizon, in time order"""
+    end = now + timedelta(hours=horizon_hours)
+    times = []
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= end:
+        for hour, minute in slots:
+            slot_time = day.replace(hour=hour, minute=minute)
+            if now < slot_time <= end:
+                times.append(slot_time)
+        day += timedelta(days=1)
+    return sorted(times)
+
+
+class PostBuffer:
+    """
+    Posts generated ahead of time, keyed by publication slot
+
+    Each entry reserves the slot's topic; `text` is None until a valid post
+    has been generated. Every change is written to disk with an atomic
+    write-rename, so a crash never leaves a half-written buffer; the write
+    runs in a thread, off the event loop.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._entries: Dict[str, Dict] = self._load()
+        self._save_lock = asyncio.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self._entries.get(key)
+
+    def items(self) -> List[Tuple[str, Dict]]:
+        return list(self._entries.items())
+
+    async def reserve(self, key: str, topic: str):
+        """Remember the topic chosen for a slot before its post exists"""
+        if key not in self._entries:
+            self._entries[key] = {"topic": topic, "text": None}
+            await self._save()
+
+    async def put(self, key: str, topic: str, text: str):
+        self._entries[key] = {
+            "topic": topic,
+            "text": text,
+            "generated_at": datetime.now().isoformat()
+        }
+        await self._save()
+
+    async def pop(self, key: str) -> Optional[Dict]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            await self._save()
+        return entry
+
+    async def prune(self, before: datetime):
+        """Drop entries of slots that are already in the past"""
+        cutoff = slot_key(before)
+        # Keys start with the slot time, so a prefix compare finds past slots
+        stale = [key for key in self._entries if key[:len(cutoff)] < cutoff]
+        for key in stale:
+            logger.warning(f"Dropping unpublished buffered post for slot {key}")
+            del self._entries[key]
+        if stale:
+            await self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load post buffer: {e}")
+            return {}
+
+    async def _save(self):
+        # Saves run one at a time, each writing the entries as they are when it starts
+        async with self._save_lock:
+            try:
+                await asyncio.to_thread(atomic_write_json, self.path, dict(self._entries))
+            except Exception as e:
+                logger.error(f"Failed to save post buffer: {e}")
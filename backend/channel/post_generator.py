@@ -1,20 +1,24 @@
 import logging
 import os
-from openai import OpenAI
+from openai import AsyncOpenAI
 from datetime import datetime
+from typing import Callable, Optional
+
+from backend.ai.client import call_with_backoff, get_openai_client
+from backend.ai.prompts import registry as prompt_registry
+from backend.metrics import record_usage, timed
 
 logger = logging.getLogger(__name__)
 
+# Seconds allowed for one completion request
+GENERATION_TIMEOUT = float(os.getenv("POST_GENERATION_TIMEOUT", "45"))
+# Total posts generated before giving up on a slot
+MAX_GENERATION_ATTEMPTS = 3
+# Added to the prompt when the previous attempt repeated an earlier post
+REPEAT_HINT = "Предыдущий вариант слишком похож на уже опубликованный пост. Напиши совсем по-другому: другой крючок, другие образы и формулировки."
 
-class PostGenerator:
-    """Generates mystical channel posts based on news"""
-    
-    def __init__(self):
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-        
-        self.system_message = """Ты — автор Telegram-канала, который соединяет мировые события через призму Таро и мистики.
+
+SYSTEM_MESSAGE = """Ты — автор Telegram-канала, который соединяет мировые события через призму Таро и мистики.
 
 ТВОЯ ЗАДАЧА:
 Создавать короткие, эмоциональные, мистически-информативные посты на основе актуальных новостей.
@@ -50,75 +54,143 @@ class PostGenerator:
 "Хочешь узнать, что это значит лично для тебя? → @taro208_bot"
 
 Отвечай ТОЛЬКО текстом поста, без дополнительных пояснений."""
+
+# Instructions first; the channel's own rules follow them, the topic, time and news come last
+POST_PROMPT = prompt_registry.template(
+    "channel_post",
+    system=SYSTEM_MESSAGE,
+    instructions="""Создай мистический пост для Telegram-канала по теме и новостям, приведённым ниже.
+
+Создай короткий (100-150 слов), живой, мистический пост:
+1. Начни с интригующего крючка
+2. Кратко о событии
+3. Мистическое объяснение энергии
+4. Совет или наблюдение
+5. ОБЯЗАТЕЛЬНО завершай: "Хочешь узнать, что это значит лично для тебя? → @taro208_bot"
+
+НЕ копируй примеры. Создай уникальный пост на основе этих новостей.
+Пиши на русском языке, естественно и живо.""",
+    variables="""Сейчас {time_of_day}. Пост о {topic_context}.
+
+Информация из новостей:
+{results}{hint}"""
+)
+
+# Topic context with emojis
+TOPIC_CONTEXTS = {
+    "space": "космических открытиях и событиях за пределами Земли 🌌",
+    "science": "научных прорывах и исследованиях 🔬",
+    "technology": "технологических новинках и изобретениях 🤖",
+    "nature": "природных явлениях и экологических событиях 🌿",
+    "energy": "энергетике дня и астрологических влияниях ✨",
+    "culture": "культурных событиях и социальных тенденциях 🎭",
+    "mystical": "мистических знаках и циклах природы 🔮"
+}
+
+
+def topic_context(topic: str) -> str:
+    """What the post is about, in the prepositional case; channel-specific topics are named as is"""
+    if topic in TOPIC_CONTEXTS:
+        return TOPIC_CONTEXTS[topic]
+    if topic and topic != "general":
+        return f"теме «{topic}»"
+    return "мировых событиях"
+
+
+def get_time_of_day(hour: int) -> str:
+    """Time of day phrase for the post prompt"""
+    if 6 <= hour < 12:
+        return "утром"
+    elif 12 <= hour < 18:
+        return "днём"
+    elif 18 <= hour < 23:
+        return "вечером"
+    else:
+        return "ночью"
+
+
+class PostGenerator:
+    """Generates mystical channel posts based on news"""
+    
+    def __init__(self, client: Optional[AsyncOpenAI] = None, timeout: float = GENERATION_TIMEOUT):
+        # Shared pooled client; retries are handled by call_with_backoff
+        self.client = (client or get_openai_client()).with_options(timeout=timeout, max_retries=0)
+        
+        self.system_message = SYSTEM_MESSAGE
     
-    async def generate_post(self, news_data: dict, time_of_day: str = None) -> str:
+    @timed("post_generator.generate_post")
+    async def generate_post(self, news_data: dict, time_of_day: str = None,
+                            system_message: str = None, prompt_suffix: str = None,
+                            hint: str = None) -> str:
         """
         Generate mystical post based on news
         
         Args:
             news_data: Dict with news information
             time_of_day: Optional time context (morning, day, evening, night)
+            system_message: Optional channel-specific system message
+            prompt_suffix: Optional channel-specific instructions added to the prompt
+            hint: Optional one-off instruction placed at the very end of the prompt
             
         Returns:
             str: Generated post text
         """
-        client = OpenAI(api_key=self.api_key)
-        
         # Get time context
         if time_of_day is None:
-            hour = datetime.now().hour
-            if 6 <= hour < 12:
-                time_of_day = "утром"
-            elif 12 <= hour < 18:
-                time_of_day = "днём"
-            elif 18 <= hour < 23:
-                time_of_day = "вечером"
-            else:
-                time_of_day = "ночью"
+            time_of_day = get_time_of_day(datetime.now().hour)
         
         topic = news_data.get('topic', 'general')
         results = news_data.get('results', '')
         
-        # Topic context with emojis
-        topic_contexts = {
-            "space": "космических открытиях и событиях за пределами Земли 🌌",
-            "science": "научных прорывах и исследованиях 🔬",
-            "technology": "технологических новинках и изобретениях 🤖",
-            "nature": "природных явлениях и экологических событиях 🌿",
-            "energy": "энергетике дня и астрологических влияниях ✨",
-            "culture": "культурных событиях и социальных тенденциях 🎭",
-            "mystical": "мистических знаках и циклах природы 🔮"
-        }
-        
-        topic_context = topic_contexts.get(topic, "мировых событиях")
-        
-        prompt = f"""Сейчас {time_of_day}. Создай мистический пост для Telegram-канала о {topic_context}.
-
-Информация из новостей:
-{results[:1500]}
-
-Создай короткий (100-150 слов), живой, мистический пост:
-1. Начни с интригующего крючка
-2. Кратко о событии
-3. Мистическое объяснение энергии
-4. Совет или наблюдение
-5. ОБЯЗАТЕЛЬНО завершай: "Хочешь узнать, что это значит лично для тебя? → @taro208_bot"
-
-НЕ копируй примеры. Создай уникальный пост на основе этих новостей.
-Пиши на русском языке, естественно и живо."""
+        prompt = POST_PROMPT.render(
+            extra=prompt_suffix,
+            time_of_day=time_of_day,
+            topic_context=topic_context(topic),
+            results=results[:1500],
+            hint=f"\n\n{hint}" if hint else ""
+        )
         
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": self.system_message},
-                {"role": "user", "content": prompt}
-            ]
+        response = await call_with_backoff(
+            lambda: self.client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": system_message or self.system_message},
+                    {"role": "user", "content": prompt}
+                ]
+            )
         )
         
+        record_usage(response.usage, "post_generator")
         result = response.choices[0].message.content
         logger.info(f"Generated post for topic '{topic}' ({len(result)} chars)")
         return result.strip()
     
+    async def generate_valid_post(self, news_data: dict, time_of_day: str = None,
+                                  system_message: str = None, prompt_suffix: str = None,
+                                  max_attempts: int = MAX_GENERATION_ATTEMPTS,
+                                  is_duplicate: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """
+        Generate a post, regenerating while it fails validation
+        
+        Args:
+            is_duplicate: Optional check against published posts; repeats are regenerated
+        
+        Returns:
+            str: Valid post text, or None if every attempt failed validation
+        """
+        hint = None
+        for attempt in range(1, max_attempts + 1):
+            post = await self.generate_post(news_data, time_of_day, system_message, prompt_suffix, hint)
+            if not self.validate_post(post):
+                logger.warning(f"Generated post failed validation (attempt {attempt}/{max_attempts})")
+                continue
+            if is_duplicate is not None and is_duplicate(post):
+                logger.warning(f"Generated post repeats a published one (attempt {attempt}/{max_attempts})")
+                hint = REPEAT_HINT
+                continue
+            return post
+        return None
+    
     def validate_post(self, post: str) -> bool:
         """Validate generated post"""
         if not post or len(post) < 50:
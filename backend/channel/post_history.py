@@ -0,0 +1,201 @@
+"""Near-duplicate detection against previously published channel posts"""
+import asyncio
+import json
+import hashlib
+import logging
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.channel.state_store import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Signature size and LSH banding: a pair of similarity s shares a band with
+# probability 1 - (1 - s^2)^32, i.e. ~0.999 at 0.5 and ~0.95 at 0.3
+SIGNATURE_SIZE = 64
+BANDS = 32
+ROWS_PER_BAND = SIGNATURE_SIZE // BANDS
+# Posts at least this similar (estimated Jaccard of shingles) are duplicates
+SIMILARITY_THRESHOLD = 0.5
+SHINGLE_WORDS = 3
+HISTORY_DAYS = 180
+
+# Every post ends with the same call to the bot; it must not count as overlap
+BOT_CALL_PATTERN = re.compile(r"Хочешь узнать.*?@\w+", re.DOTALL)
+WORD_PATTERN = re.compile(r"\w+")
+EMPTY_BIN = (1 << 64) - 1
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> Set[str]:
+    """Word n-grams of normalized post text"""
+    words = WORD_PATTERN.findall(BOT_CALL_PATTERN.sub(" ", text).lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """
+    One-permutation MinHash signature
+
+    Each shingle is hashed once; the hash picks a bin and the smallest
+    remaining value per bin is kept. Empty bins borrow from the next
+    filled bin, so short posts still get comparable signatures.
+    """
+    bins = [EMPTY_BIN] * SIGNATURE_SIZE
+    for shingle in shingles(text):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        index = value % SIGNATURE_SIZE
+        value //= SIGNATURE_SIZE
+        if value < bins[index]:
+            bins[index] = value
+
+    if all(value == EMPTY_BIN for value in bins):
+        return tuple(bins)
+    for index in range(SIGNATURE_SIZE):
+        offset = 1
+        while bins[index] == EMPTY_BIN:
+            bins[index] = bins[(index + offset) % SIGNATURE_SIZE]
+            offset += 1
+    return tuple(bins)
+
+
+def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(a == b for a, b in zip(first, second)) / SIGNATURE_SIZE
+
+
+class PostHistoryIndex:
+    """
+    MinHash/LSH index of published posts, persisted as JSON lines
+
+    Lookups only compare against posts sharing at least one LSH band with
+    the candidate, so their cost doesn't grow with the archive. Posts are
+    appended to the file as they are published; entries older than
+    `history_days` are dropped (and the file rewritten) on load.
+    """
+
+    def __init__(self, path: Path, threshold: float = SIMILARITY_THRESHOLD,
+                 history_days: int = HISTORY_DAYS):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.history_days = history_days
+        self._posts: List[Dict] = []
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self._load()
+
+    def find_similar(self, text: str, chat_id: Optional[str] = None,
+                     pending: Iterable[str] = ()) -> Optional[Tuple[float, Dict]]:
+        """
+        Most similar post at or above the threshold, with its similarity
+
+        Published posts come from the index; `pending` are texts generated
+        but not published yet (e.g. buffered for a later slot), compared
+        directly and returned with `published_at` None.
+        """
+        signature = minhash(text)
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        best = None
+        for post_id in candidates:
+            post = self._posts[post_id]
+            if chat_id is not None and post["chat_id"] != chat_id:
+                continue
+            score = similarity(signature, post["signature"])
+            if score >= self.threshold and (best is None or score > best[0]):
+                best = (score, post)
+
+        for other in pending:
+            score = similarity(signature, minhash(other))
+            if score >= self.threshold and (best is None or score > best[0]):
+                best = (score, {"chat_id": chat_id, "published_at": None, "preview": other[:80]})
+        return best
+
+    def is_duplicate(self, text: str, chat_id: Optional[str] = None, pending: Iterable[str] = ()) -> bool:
+        match = self.find_similar(text, chat_id, pending)
+        if match:
+            score, post = match
+            if post["published_at"] is None:
+                logger.warning(f"Post is {score:.0%} similar to a buffered one: {post['preview']}")
+            else:
+                logger.warning(f"Post is {score:.0%} similar to the one published {post['published_at']}")
+        return match is not None
+
+    async def add(self, text: str, chat_id: str, published_at: Optional[datetime] = None):
+        """Record a published post; the file append runs in a thread"""
+        record = {
+            "chat_id": chat_id,
+            "published_at": (published_at or datetime.now()).isoformat(timespec="seconds"),
+            "signature": minhash(text),
+            "preview": text[:80],
+        }
+        self._index(record)
+        try:
+            await asyncio.to_thread(self._append, json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logger.error(f"Failed to save post history: {e}")
+
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(BANDS):
+            start = band * ROWS_PER_BAND
+            yield band, signature[start:start + ROWS_PER_BAND]
+
+    def _index(self, record: Dict):
+        record["signature"] = tuple(record["signature"])
+        post_id = len(self._posts)
+        self._posts.append(record)
+        for key in self._band_keys(record["signature"]):
+            self._buckets.setdefault(key, []).append(post_id)
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        cutoff = (datetime.now() - timedelta(days=self.history_days)).isoformat(timespec="seconds")
+        expired = 0
+        corrupt = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                        if record["published_at"] < cutoff:
+                            expired += 1
+                            continue
+                        self._index(record)
+                    except (ValueError, KeyError, TypeError) as e:
+                        # e.g. a line torn by a crash during add(); the rest of the history is still good
+                        logger.warning(f"Skipping bad post history line {number}: {e}")
+                        corrupt += 1
+        except Exception as e:
+            logger.error(f"Failed to load post history: {e}")
+            return
+
+        logger.info(f"Post history: {len(self._posts)} posts loaded from {self.path}")
+        if expired or corrupt:
+            try:
+                self._rewrite()
+            except Exception as e:
+                logger.error(f"Failed to compact post history: {e}")
+
+    def _append(self, line: str):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def _rewrite(self):
+        """Replace the file with the posts still in the index"""
+        def write(f):
+            for record in self._posts:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        atomic_write(self.path, write)
@@ -0,0 +1,337 @@
+"""Multi-channel fan-out publisher for scheduled posts"""
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from backend.channel.news_fetcher import NewsFetcher
+from backend.channel.post_buffer import PostBuffer, slot_key, upcoming_slot_times
+from backend.channel.post_generator import PostGenerator, get_time_of_day
+from backend.channel.post_history import PostHistoryIndex
+from backend.channel.state_store import RotationState
+
+logger = logging.getLogger(__name__)
+
+# Cap on LLM generations running at once across all channels
+MAX_CONCURRENT_GENERATIONS = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "4"))
+# Telegram flood limits: ~20 messages per minute into one chat, ~30 per second overall
+PER_CHAT_RATE = 20 / 60
+PER_CHAT_BURST = 3
+GLOBAL_RATE = 25.0
+GLOBAL_BURST = 25
+
+
+@dataclass
+class SlotSpec:
+    """A daily publication time with its topic rotation"""
+    hour: int
+    minute: int
+    topics: List[str]
+    # Rotation state key; defaults to one per channel and slot
+    rotation_key: Optional[str] = None
+    name: str = ""
+
+    @property
+    def time(self) -> Tuple[int, int]:
+        return self.hour, self.minute
+
+
+@dataclass
+class ChannelSpec:
+    """A channel with its schedule and prompt overrides"""
+    chat_id: str
+    slots: List[SlotSpec]
+    # Replaces PostGenerator's system message (e.g. another language or theme)
+    system_message: Optional[str] = None
+    # Extra instructions appended to every post prompt
+    prompt_suffix: Optional[str] = None
+    default_topic: str = "energy"
+    enabled: bool = True
+
+    def slot_at(self, hour: int, minute: int) -> Optional[SlotSpec]:
+        for slot in self.slots:
+            if slot.time == (hour, minute):
+                return slot
+        return None
+
+    def rotation_key(self, slot: SlotSpec) -> str:
+        return slot.rotation_key or f"{self.chat_id}@{slot.hour:02d}:{slot.minute:02d}"
+
+
+def default_registry() -> List[ChannelSpec]:
+    """The original single-channel schedule of @taro209"""
+    return [
+        ChannelSpec(
+            chat_id="@taro209",
+            slots=[
+                SlotSpec(9, 0, ["energy"], name="Morning Post (Energy)"),
+                SlotSpec(14, 0, ["space", "science"], rotation_key="day_rotation_index",
+                         name="Day Post (Space/Science)"),
+                SlotSpec(19, 0, ["technology", "nature"], rotation_key="evening_rotation_index",
+                         name="Evening Post (Tech/Nature)"),
+                SlotSpec(22, 30, ["space"], name="Night Post (Space)"),
+            ]
+        )
+    ]
+
+
+def load_registry(path: Optional[str]) -> List[ChannelSpec]:
+    """
+    Load channels from a JSON file, or the default registry if no file is set
+
+    Format:
+        [{"chat_id": "@channel", "system_message": "...", "prompt_suffix": "...",
+          "slots": [{"time": "14:00", "topics": ["space", "science"]}]}]
+    """
+    if not path:
+        return default_registry()
+
+    with open(Path(path), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    channels = []
+    for item in data:
+        slots = []
+        for slot in item["slots"]:
+            hour, minute = (int(part) for part in slot["time"].split(":"))
+            slots.append(SlotSpec(hour, minute, slot["topics"],
+                                  rotation_key=slot.get("rotation_key"), name=slot.get("name", "")))
+        channels.append(ChannelSpec(
+            chat_id=item["chat_id"],
+            slots=slots,
+            system_message=item.get("system_message"),
+            prompt_suffix=item.get("prompt_suffix"),
+            default_topic=item.get("default_topic", "energy"),
+            enabled=item.get("enabled", True)
+        ))
+    return [channel for channel in channels if channel.enabled]
+
+
+class TokenBucket:
+    """Token bucket rate limiter: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ChannelPublisher:
+    """
+    Generates and publishes posts for every channel of the registry
+
+    Generations for one slot run concurrently under a shared cap; sends go
+    through a global and a per-chat token bucket.
+    """
+
+    def __init__(self, bot: Bot, channels: List[ChannelSpec], rotation_state: RotationState,
+                 post_buffer: PostBuffer, news_fetcher: Optional[NewsFetcher] = None,
+                 post_history: Optional[PostHistoryIndex] = None,
+                 max_concurrent_generations: int = MAX_CONCURRENT_GENERATIONS):
+        self.bot = bot
+        self.news_fetcher = news_fetcher
+        self.post_history = post_history
+        self.channels = channels
+        self.rotation_state = rotation_state
+        self.post_buffer = post_buffer
+        self._generation_slots = asyncio.Semaphore(max_concurrent_generations)
+        self._global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+
+    def slot_times(self) -> List[Tuple[int, int]]:
+        """Distinct (hour, minute) pairs used by any channel"""
+        return sorted({slot.time for channel in self.channels for slot in channel.slots})
+
+    async def topic_for(self, channel: ChannelSpec, slot: SlotSpec) -> str:
+        """Current topic of a slot; advances its rotation"""
+        if len(slot.topics) == 1:
+            return slot.topics[0]
+        index = await self.rotation_state.advance(channel.rotation_key(slot), len(slot.topics))
+        topic = slot.topics[index]
+        logger.info(f"{channel.chat_id} {slot.hour:02d}:{slot.minute:02d} rotation: selected '{topic}'")
+        return topic
+
+    async def generate(self, channel: ChannelSpec, topic: str, hour: int = None) -> Optional[str]:
+        """Generate and validate a post; returns None if every attempt failed validation"""
+        news_data = await self.fetch_news(topic)
+        time_of_day = get_time_of_day(hour) if hour is not None else None
+        is_duplicate = None
+        if self.post_history is not None:
+            is_duplicate = lambda text: self.post_history.is_duplicate(
+                text, channel.chat_id, pending=self.buffered_texts(channel.chat_id)
+            )
+
+        async with self._generation_slots:
+            logger.info(f"Generating '{topic}' post for {channel.chat_id}")
+            post_generator = PostGenerator()
+            post_text = await post_generator.generate_valid_post(
+                news_data,
+                time_of_day=time_of_day,
+                system_message=channel.system_message,
+                prompt_suffix=channel.prompt_suffix,
+                is_duplicate=is_duplicate
+            )
+
+        if post_text is None:
+            logger.error(f"Generated post for {channel.chat_id} failed validation")
+            return None
+
+        logger.info(f"Post generated for {channel.chat_id} ({len(post_text)} chars)")
+        logger.info(f"Post preview: {post_text[:100]}...")
+        return post_text
+
+    def buffered_texts(self, chat_id: str) -> List[str]:
+        """Posts generated for a channel's upcoming slots that are not published yet"""
+        return [
+            entry["text"] for key, entry in self.post_buffer.items()
+            if key.endswith(f"|{chat_id}") and entry.get("text")
+        ]
+
+    async def fetch_news(self, topic: str) -> dict:
+        """News for the prompt: pre-fetched feed items, search context or just the topic"""
+        if self.news_fetcher is not None and topic:
+            news_data = await self.news_fetcher.fetch_news(topic)
+            if news_data.get("results"):
+                return news_data
+
+        return {
+            "topic": topic or "energy",
+            "query": "",
+            "results": f"Сегодняшняя тема: {topic or 'энергия дня'}",
+            "timestamp": datetime.now()
+        }
+
+    async def send(self, chat_id: str, post_text: str):
+        """Send a post, respecting global and per-chat flood limits"""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(PER_CHAT_RATE, PER_CHAT_BURST)
+
+        await bucket.acquire()
+        await self._global_bucket.acquire()
+
+        logger.info(f"Publishing to channel: {chat_id}")
+        try:
+            try:
+                message = await self.bot.send_message(chat_id=chat_id, text=post_text, parse_mode=None)
+            except TelegramRetryAfter as e:
+                logger.warning(f"Flood control for {chat_id}, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+                message = await self.bot.send_message(chat_id=chat_id, text=post_text, parse_mode=None)
+            logger.info(f"✅ Post published to {chat_id}! Message ID: {message.message_id}")
+            if self.post_history is not None:
+                await self.post_history.add(post_text, chat_id)
+        except Exception as e:
+            logger.error(f"❌ Failed to publish post to {chat_id}: {e}")
+            # Log full post for debugging
+            logger.error(f"Post text: {post_text}")
+            raise
+
+    async def fill_buffer(self, horizon_hours: float):
+        """Generate posts for every channel's upcoming slots ahead of time"""
+        now = datetime.now()
+        # Keep a late-firing slot's post around for a while
+        await self.post_buffer.prune(now - timedelta(hours=1))
+
+        jobs = []
+        for channel in self.channels:
+            slot_times = upcoming_slot_times(now, [slot.time for slot in channel.slots], horizon_hours)
+            for slot_time in slot_times:
+                slot = channel.slot_at(slot_time.hour, slot_time.minute)
+                jobs.append(self._fill_slot(channel, slot, slot_time))
+
+        await asyncio.gather(*jobs)
+
+    async def _fill_slot(self, channel: ChannelSpec, slot: SlotSpec, slot_time: datetime):
+        key = buffer_key(slot_time, channel.chat_id)
+        entry = self.post_buffer.get(key)
+        if entry and entry.get("text"):
+            return
+
+        # The rotation advances once per slot: the topic is reserved before generating
+        if entry is None:
+            await self.post_buffer.reserve(key, await self.topic_for(channel, slot))
+            entry = self.post_buffer.get(key)
+
+        topic = entry["topic"]
+        try:
+            post_text = await self.generate(channel, topic, hour=slot_time.hour)
+        except Exception as e:
+            logger.error(f"Failed to pre-generate post for {key}: {e}", exc_info=True)
+            return
+
+        if post_text:
+            await self.post_buffer.put(key, topic, post_text)
+            logger.info(f"📦 Buffered '{topic}' post for {key}")
+
+    async def publish_slot(self, hour: int, minute: int):
+        """Publish a slot on every channel that has it"""
+        slot_time = datetime.now().replace(hour=hour, minute=minute, second=0, microsecond=0)
+        channels = [channel for channel in self.channels if channel.slot_at(hour, minute)]
+        logger.info("=" * 50)
+        logger.info(f"Publishing slot {hour:02d}:{minute:02d} to {len(channels)} channel(s)")
+
+        await asyncio.gather(*(self._publish_channel_slot(channel, slot_time) for channel in channels))
+
+    async def _publish_channel_slot(self, channel: ChannelSpec, slot_time: datetime):
+        key = buffer_key(slot_time, channel.chat_id)
+        try:
+            # The entry stays buffered until the send succeeds, so a failed or interrupted
+            # send leaves the post for a retry (or prune() once the slot is over)
+            entry = self.post_buffer.get(key)
+            if entry and entry.get("text"):
+                logger.info(f"📦 Publishing buffered '{entry['topic']}' post for {key}")
+                await self.send(channel.chat_id, entry["text"])
+                await self.post_buffer.pop(key)
+                return
+
+            logger.warning(f"No buffered post for {key}, generating now")
+            slot = channel.slot_at(slot_time.hour, slot_time.minute)
+            topic = entry["topic"] if entry else await self.topic_for(channel, slot)
+            post_text = await self.generate(channel, topic, hour=slot_time.hour)
+            if post_text:
+                await self.send(channel.chat_id, post_text)
+                await self.post_buffer.pop(key)
+        except Exception as e:
+            logger.error(f"Error publishing {key}: {e}", exc_info=True)
+
+    async def publish_now(self, hour: int):
+        """Post immediately to every channel, using the topic of the slot at `hour` if any"""
+        async def publish(channel: ChannelSpec):
+            try:
+                slot = next((slot for slot in channel.slots if slot.hour == hour), None)
+                topic = await self.topic_for(channel, slot) if slot else channel.default_topic
+                logger.info(f"Test post for {channel.chat_id} will use topic for hour {hour}: {topic}")
+                post_text = await self.generate(channel, topic, hour=hour)
+                if post_text:
+                    await self.send(channel.chat_id, post_text)
+            except Exception as e:
+                logger.error(f"❌ Test post to {channel.chat_id} failed: {e}", exc_info=True)
+
+        await asyncio.gather(*(publish(channel) for channel in self.channels))
+
+
+def buffer_key(slot_time: datetime, chat_id: str) -> str:
+    """Post buffer key: slot time first, so keys still sort by time"""
+    return f"{slot_key(slot_time)}|{chat_id}"
@@ -0,0 +1,137 @@
+"""Crash-safe storage for the channel poster rotation state"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROTATION_STATE = {
+    "day_rotation_index": 0,  # for 14:00 (space/science)
+    "evening_rotation_index": 0  # for 19:00 (technology/nature)
+}
+
+
+def atomic_write(path: Path, write: Callable[[TextIO], None]) -> None:
+    """Write `path` through `write(f)` into a temp file in the same directory, fsync it and rename it over `path`"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path: Path, data) -> None:
+    atomic_write(path, lambda f: json.dump(data, f, ensure_ascii=False))
+
+
+class FileStateStore:
+    """Rotation state in a local JSON file, replaced atomically on save"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    async def load(self) -> Optional[Dict]:
+        return await asyncio.to_thread(self._read)
+
+    async def save(self, state: Dict):
+        await asyncio.to_thread(atomic_write_json, self.path, state)
+
+    def _read(self) -> Optional[Dict]:
+        if not self.path.exists():
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def __str__(self) -> str:
+        return f"file {self.path}"
+
+
+class MongoStateStore:
+    """Rotation state in MongoDB, survives redeploys that wipe the local disk"""
+
+    def __init__(self, db, key: str = "channel_poster_rotation"):
+        self.collection = db.db.poster_state
+        self.key = key
+
+    async def load(self) -> Optional[Dict]:
+        doc = await self.collection.find_one({"_id": self.key})
+        return doc.get("state") if doc else None
+
+    async def save(self, state: Dict):
+        await self.collection.update_one(
+            {"_id": self.key},
+            {"$set": {"state": state}},
+            upsert=True
+        )
+
+    def __str__(self) -> str:
+        return f"mongo poster_state/{self.key}"
+
+
+class RotationState:
+    """
+    In-memory rotation state backed by a pluggable store
+
+    The store is read once; it is written only when an index actually changes.
+    """
+
+    def __init__(self, store, defaults: Dict = None):
+        self.store = store
+        self._state = dict(defaults or DEFAULT_ROTATION_STATE)
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def load(self):
+        try:
+            stored = await self.store.load()
+            if stored:
+                self._state.update(stored)
+        except Exception as e:
+            logger.error(f"Failed to load state: {e}")
+        self._loaded = True
+        logger.info(f"Rotation state loaded from {self.store}: {self._state}")
+
+    async def advance(self, key: str, size: int) -> int:
+        """Return the current index for `key` and move it to the next of `size` options"""
+        async with self._lock:
+            if not self._loaded:
+                await self.load()
+
+            index = self._state.get(key, 0) % size
+            next_index = (index + 1) % size
+            if next_index != self._state.get(key):
+                self._state[key] = next_index
+                try:
+                    await self.store.save(self._state)
+                    logger.info(f"State saved: {self._state}")
+                except Exception as e:
+                    logger.error(f"Failed to save state: {e}")
+            return index
+
+    def snapshot(self) -> Dict:
+        return dict(self._state)
+
+
+def create_state_store(backend: str, file_path: Path, db=None):
+    """Build the configured store: 'file' or 'mongo' (needs a Database)"""
+    if backend == "mongo":
+        if db is None:
+            from backend.database import Database
+            from backend.config import config
+            db = Database(config.MONGO_URL, config.DB_NAME)
+        return MongoStateStore(db)
+    return FileStateStore(file_path)
@@ -7,6 +7,11 @@ class Config(BaseSettings):
     EMERGENT_LLM_KEY: Optional[str] = None
     MONGO_URL: str = "mongodb://localhost:27017"
     DB_NAME: str = "tarot_bot"
+    # Seconds to keep user documents in the process cache (0 disables it)
+    USER_CACHE_TTL: float = 0
+    # Channel poster rotation state: "file" or "mongo" (survives redeploys)
+    POSTER_STATE_BACKEND: str = "file"
+    POSTER_STATE_FILE: str = "/tmp/channel_poster_state.json"
     
     class Config:
         env_file = ".env"
@@ -1,21 +1,99 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from datetime import datetime, timezone
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from datetime import datetime, timezone, timedelta
 from typing import Optional, List, Dict
 import logging
 
+from backend.cache import TTLCache
+from backend.metrics import timed
+from backend.write_behind import ReadingWriter
+
 logger = logging.getLogger(__name__)
 
+# Free users get this many readings of each limited kind per day
+FREE_DAILY_LIMIT = 2
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Reading type -> limits counter it consumes
+LIMIT_COUNTERS = {
+    "card_of_day": "daily_cards_used",
+    # Simple spreads: limited to 2 per day for free users
+    "one_question": "simple_spreads_used",
+    "three_card_spread": "simple_spreads_used",
+    "advice": "simple_spreads_used",
+    "tarot_advice": "simple_spreads_used",
+}
+
+# Limits counter -> message code returned when it is exhausted
+LIMIT_MESSAGES = {
+    "daily_cards_used": "card_of_day",
+    "simple_spreads_used": "simple_spread",
+}
+
+PREMIUM_ONLY_READINGS = {"deep_spread", "personal_energy"}
+
+# History only shows type, date and card names - never fetch interpretation texts
+HISTORY_PROJECTION = {
+    "_id": 0,
+    "type": 1,
+    "created_at": 1,
+    "cards.name_ru": 1,
+    "cards.name_uk": 1,
+    "cards.is_reversed": 1
+}
+HISTORY_INDEX = [("user_id", ASCENDING), ("created_at", DESCENDING)]
+
+
+def _plan_stages(plan: Dict) -> List[str]:
+    """Flatten stage names of an explain() plan tree"""
+    stages = [plan.get("stage", "?")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
 class Database:
-    def __init__(self, mongo_url: str, db_name: str):
-        self.client = AsyncIOMotorClient(mongo_url)
+    def __init__(self, mongo_url: str, db_name: str, user_cache_ttl: float = 0,
+                 user_cache_size: int = 10000, client=None):
+        # `client` replaces the Motor client, e.g. with an in-memory stand-in for benchmarks
+        self.client = client if client is not None else AsyncIOMotorClient(mongo_url)
         self.db = self.client[db_name]
         self.users = self.db.users
         self.readings = self.db.readings
+        # Optional short-lived process cache of user documents; write paths keep it fresh
+        self.user_cache = TTLCache(maxsize=user_cache_size, ttl=user_cache_ttl) if user_cache_ttl > 0 else None
+        # Write-behind queue for readings, active between start_writer() and stop_writer()
+        self.writer: Optional[ReadingWriter] = None
         logger.info(f"MongoDB connected: {db_name}")
     
+    @timed("db.get_user")
     async def get_user(self, user_id: int) -> Optional[Dict]:
-        return await self.users.find_one({"_id": user_id})
+        if self.user_cache is not None:
+            user = self.user_cache.get(user_id)
+            if user is not None:
+                return user
+        
+        user = await self.users.find_one({"_id": user_id})
+        if user is not None and self.user_cache is not None:
+            self.user_cache.set(user_id, user)
+        return user
+    
+    def invalidate_user(self, user_id: int):
+        """Drop cached user document after a write"""
+        if self.user_cache is not None:
+            self.user_cache.pop(user_id)
     
+    def _patch_cached_user(self, user_id: int, fields: Dict):
+        """Replace top-level fields of a cached user document"""
+        if self.user_cache is None:
+            return
+        user = self.user_cache.get(user_id)
+        if user is not None:
+            # Cached documents may be held by running handlers, never mutate them
+            self.user_cache.set(user_id, {**user, **fields})
+    
+    @timed("db.create_user")
     async def create_user(self, user_id: int, name: str, username: str = "", birthdate: str = None):
         user = {
             "_id": user_id,
@@ -33,6 +111,7 @@ class Database:
             "stats": {"total_readings": 0}
         }
         await self.users.insert_one(user)
+        self.invalidate_user(user_id)
         logger.info(f"User created: {user_id} - {name} - {birthdate}")
         return user
     
@@ -41,63 +120,98 @@ class Database:
             {"_id": user_id},
             {"$set": {"zodiac_sign": zodiac}}
         )
+        self.invalidate_user(user_id)
     
-    async def check_and_update_limits(self, user_id: int, reading_type: str) -> tuple[bool, str]:
+    @timed("db.check_and_update_limits")
+    async def check_and_update_limits(self, user_id: int, reading_type: str,
+                                      user: Optional[Dict] = None) -> tuple[bool, str, Optional[Dict]]:
         """
         Check if user can make a reading and update limits
-        Returns: (can_proceed, message)
+        
+        Daily reset, limit check and increment happen in a single atomic
+        find_one_and_update, so concurrent taps can't both pass the limit.
+        `user` is the document already loaded for this update, if any; it
+        lets premium decisions skip the database entirely.
+        Returns: (can_proceed, message, limits) where `limits` are the
+        user's counters after the increment, or None when no counter was
+        consumed (premium users, premium-only and unlimited readings,
+        limit reached)
         """
-        user = await self.get_user(user_id)
+        if user is not None and user.get("premium", False):
+            # Premium users have no limits
+            return True, "", None
+        
+        if reading_type in PREMIUM_ONLY_READINGS:
+            if user is not None:
+                return False, "premium_only", None
+            # Premium only features
+            user = await self.users.find_one({"_id": user_id, "premium": True}, {"_id": 1})
+            return (True, "", None) if user else (False, "premium_only", None)
         
-        # Premium users have no limits
-        if user.get("premium", False):
-            return True, ""
+        counter = LIMIT_COUNTERS.get(reading_type)
+        if counter is None:
+            return True, "", None
         
-        limits = user.get("limits", {})
-        last_reset = limits.get("last_reset", datetime.now(timezone.utc))
         now = datetime.now(timezone.utc)
+        field = f"limits.{counter}"
         
-        # Make sure last_reset is timezone-aware (for old database records)
-        if last_reset.tzinfo is None:
-            last_reset = last_reset.replace(tzinfo=timezone.utc)
+        # Counters are reset when the last reset is a day or more ago
+        needs_reset = {
+            "$gte": [{"$subtract": [now, {"$ifNull": ["$limits.last_reset", now]}]}, DAY_MS]
+        }
+        reset_counters = {
+            f"limits.{name}": {"$cond": [needs_reset, 0, {"$ifNull": [f"$limits.{name}", 0]}]}
+            for name in sorted(set(LIMIT_COUNTERS.values()))
+        }
+        reset_counters["limits.last_reset"] = {
+            "$cond": [needs_reset, now, {"$ifNull": ["$limits.last_reset", now]}]
+        }
         
-        # Reset daily limits if it's a new day
-        if (now - last_reset).days >= 1:
-            await self.users.update_one(
-                {"_id": user_id},
+        user = await self.users.find_one_and_update(
+            {
+                "_id": user_id,
+                "$or": [
+                    # Premium users have no limits
+                    {"premium": True},
+                    {field: {"$not": {"$gte": FREE_DAILY_LIMIT}}},
+                    {"limits.last_reset": {"$lte": now - timedelta(days=1)}}
+                ]
+            },
+            [
+                {"$set": reset_counters},
                 {"$set": {
-                    "limits.daily_cards_used": 0,
-                    "limits.simple_spreads_used": 0,
-                    "limits.last_reset": now
+                    field: {"$cond": [{"$eq": ["$premium", True]}, f"${field}", {"$add": [f"${field}", 1]}]}
                 }}
-            )
-            limits = {"daily_cards_used": 0, "simple_spreads_used": 0}
-        
-        # Check limits based on reading type
-        if reading_type == "card_of_day":
-            if limits.get("daily_cards_used", 0) >= 2:
-                return False, "card_of_day"
-        elif reading_type in ["one_question", "three_card_spread", "advice", "tarot_advice"]:
-            # Simple spreads: limited to 2 per day for free users
-            if limits.get("simple_spreads_used", 0) >= 2:
-                return False, "simple_spread"
-        elif reading_type in ["deep_spread", "personal_energy"]:
-            # Premium only features
-            return False, "premium_only"
+            ],
+            projection={"premium": 1, "limits": 1},
+            return_document=ReturnDocument.AFTER
+        )
         
-        # Update limits
-        if reading_type == "card_of_day":
-            await self.users.update_one(
-                {"_id": user_id},
-                {"$inc": {"limits.daily_cards_used": 1}}
-            )
-        elif reading_type in ["one_question", "three_card_spread", "advice", "tarot_advice"]:
-            await self.users.update_one(
-                {"_id": user_id},
-                {"$inc": {"limits.simple_spreads_used": 1}}
-            )
+        if user is None:
+            return False, LIMIT_MESSAGES[counter], None
         
-        return True, ""
+        self._patch_cached_user(user_id, {"premium": user.get("premium", False), "limits": user["limits"]})
+        logger.debug(f"Limits for user {user_id}: {user.get('limits')}")
+        return True, "", user["limits"]
+    
+    @timed("db.refund_limit")
+    async def refund_limit(self, user_id: int, reading_type: str):
+        """
+        Give back a reading consumed by check_and_update_limits that never happened
+        
+        Premium users and premium-only readings consumed nothing, and a
+        counter already reset to zero is left alone.
+        """
+        counter = LIMIT_COUNTERS.get(reading_type)
+        if counter is None:
+            return
+        
+        field = f"limits.{counter}"
+        await self.users.update_one(
+            {"_id": user_id, "premium": {"$not": {"$eq": True}}, field: {"$gte": 1}},
+            {"$inc": {field: -1}}
+        )
+        self.invalidate_user(user_id)
     
     async def set_premium(self, user_id: int, is_premium: bool = True):
         """Set user premium status"""
@@ -105,30 +219,53 @@ class Database:
             {"_id": user_id},
             {"$set": {"premium": is_premium}}
         )
+        self.invalidate_user(user_id)
         logger.info(f"User {user_id} premium status set to: {is_premium}")
     
+    @timed("db.save_reading")
     async def save_reading(self, user_id: int, reading_type: str, cards: List[Dict], interpretation: str, question: str = None):
         reading = {
             "user_id": user_id,
             "type": reading_type,
             "question": question,
-            "cards": cards,
+            "cards": [card.to_dict() if hasattr(card, 'to_dict') else card for card in cards],
             "interpretation": interpretation,
             "created_at": datetime.now(timezone.utc)
         }
+        
+        if self.writer is not None:
+            await self.writer.enqueue(reading)
+            self.invalidate_user(user_id)
+            logger.info(f"Reading queued: {user_id} - {reading_type}")
+            return
+        
         await self.readings.insert_one(reading)
         await self.users.update_one(
             {"_id": user_id},
             {"$inc": {"stats.total_readings": 1}}
         )
+        self.invalidate_user(user_id)
         logger.info(f"Reading saved: {user_id} - {reading_type}")
     
+    def start_writer(self, **kwargs):
+        """Switch save_reading to batched write-behind persistence"""
+        if self.writer is None:
+            self.writer = ReadingWriter(self.readings, self.users, **kwargs)
+            self.writer.start()
+    
+    async def stop_writer(self):
+        """Flush queued readings and go back to inline writes"""
+        if self.writer is not None:
+            writer, self.writer = self.writer, None
+            await writer.stop()
+    
     async def increment_limit(self, user_id: int, limit_type: str):
         field = f"limits.{limit_type}"
         await self.users.update_one(
             {"_id": user_id},
             {"$inc": {field: 1}}
         )
+        self.invalidate_user(user_id)
     
     async def reset_limits_if_needed(self, user_id: int):
         user = await self.get_user(user_id)
@@ -148,8 +285,37 @@ class Database:
                     "limits.last_reset": now
                 }}
             )
+            self.invalidate_user(user_id)
             logger.info(f"Limits reset for user {user_id}")
     
+    async def ensure_indexes(self):
+        """Create indexes used by the bot queries (no-op if they already exist)"""
+        await self.readings.create_index(HISTORY_INDEX, name="user_id_created_at")
+        logger.info("MongoDB indexes ensured")
+    
+    async def check_history_query_plan(self, user_id: int = 0) -> List[str]:
+        """
+        Log the winning plan of the reading history query
+        
+        Returns the plan stages; a COLLSCAN or in-memory SORT means the
+        history index is missing or not used.
+        """
+        cursor = self._history_cursor(user_id, limit=10)
+        explain = await cursor.explain()
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning_plan)
+        
+        if "COLLSCAN" in stages or "SORT" in stages:
+            logger.warning(f"Reading history query is not index-backed: {' <- '.join(stages)}")
+        else:
+            logger.info(f"Reading history query plan: {' <- '.join(stages)}")
+        return stages
+    
+    def _history_cursor(self, user_id: int, limit: int):
+        return self.readings.find({"user_id": user_id}, HISTORY_PROJECTION).sort("created_at", -1).limit(limit)
+    
+    @timed("db.get_user_readings")
     async def get_user_readings(self, user_id: int, limit: int = 10) -> List[Dict]:
-        cursor = self.readings.find({"user_id": user_id}).sort("created_at", -1).limit(limit)
+        """Latest readings of a user: type, date and card names only"""
+        cursor = self._history_cursor(user_id, limit)
         return await cursor.to_list(length=limit)
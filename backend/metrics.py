@@ -0,0 +1,195 @@
+"""In-process metrics with a Prometheus text endpoint"""
+import functools
+import inspect
+import logging
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Port of the /metrics endpoint; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(key)} {value:g}"
+
+
+class Histogram:
+    """Bucketed distribution per label set; observe() is a bisect and three additions"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # label set -> [per-bucket counts (last one is +Inf), sum, count]
+        self._values: Dict[LabelKey, List] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(_label_key(labels))
+        return state[2] if state else 0
+
+    def render(self) -> Iterator[str]:
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}"
+            yield f"{self.name}_sum{_format_labels(key)} {total:g}"
+            yield f"{self.name}_count{_format_labels(key)} {count}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, help_text)
+        return self._metrics[name]
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, help_text, buckets)
+        return self._metrics[name]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram("tarot_stage_seconds", "Duration of hot path stages")
+STAGE_ERRORS = registry.counter("tarot_stage_errors_total", "Hot path stages that raised")
+HANDLER_SECONDS = registry.histogram("tarot_handler_seconds", "Duration of bot handlers")
+HANDLER_ERRORS = registry.counter("tarot_handler_errors_total", "Bot handlers that raised")
+TELEGRAM_REQUEST_SECONDS = registry.histogram("tarot_telegram_request_seconds", "Duration of Bot API requests")
+TELEGRAM_REQUEST_ERRORS = registry.counter("tarot_telegram_request_errors_total", "Failed Bot API requests")
+LLM_FIRST_TOKEN_SECONDS = registry.histogram("tarot_llm_first_token_seconds", "Time to the first streamed token")
+LLM_TOKENS = registry.counter("tarot_llm_tokens_total", "OpenAI tokens by kind, as reported in `usage`")
+
+
+def timed(stage: str):
+    """
+    Record the duration of a coroutine or async generator function as `stage`
+
+    Exceptions are counted in tarot_stage_errors_total by type and re-raised.
+    For async generators the time runs until the generator is exhausted or closed.
+    """
+    def decorator(func):
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def generator_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                except Exception as e:
+                    STAGE_ERRORS.inc(stage=stage, error=type(e).__name__)
+                    raise
+                finally:
+                    STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                STAGE_ERRORS.inc(stage=stage, error=type(e).__name__)
+                raise
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        return wrapper
+    return decorator
+
+
+def record_usage(usage, source: str):
+    """Count tokens of an OpenAI response's `usage` (None is ignored)"""
+    if usage is None:
+        return
+    LLM_TOKENS.inc(usage.prompt_tokens or 0, source=source, kind="prompt")
+    LLM_TOKENS.inc(usage.completion_tokens or 0, source=source, kind="completion")
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    if cached:
+        LLM_TOKENS.inc(cached, source=source, kind="cached_prompt")
+
+
+async def _metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server(port: Optional[int] = None, host: str = METRICS_HOST) -> Optional[web.AppRunner]:
+    """Serve GET /metrics on host:port (default METRICS_PORT); returns the runner to clean up, or None if disabled"""
+    if port is None:
+        port = METRICS_PORT
+    if not port:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrics endpoint: http://{host}:{port}/metrics")
+    return runner
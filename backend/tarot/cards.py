@@ -1,42 +1,178 @@
 import json
 import random
-from typing import List, Dict
+import threading
+from types import MappingProxyType
+from typing import List, Dict, Iterator, Optional, Tuple
 import os
 
-class TarotDeck:
-    def __init__(self, cards_file: str = "data/tarot_cards.json"):
-        # Get the project root directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(os.path.dirname(current_dir))
-        full_path = os.path.join(project_root, cards_file)
-        
+DEFAULT_CARDS_FILE = "data/tarot_cards.json"
+
+
+class Card:
+    """Immutable card record shared by every deck in the process"""
+
+    __slots__ = ("id", "name_ru", "upright", "reversed", "_fields")
+
+    def __init__(self, fields: Dict):
+        self.id = fields.get('id')
+        self.name_ru = fields['name_ru']
+        self.upright = fields['upright']
+        self.reversed = fields['reversed']
+        # Read-only view so a shared record can't be changed by one reading
+        self._fields = MappingProxyType(dict(fields))
+
+    def __getitem__(self, key: str):
+        return self._fields[key]
+
+    def get(self, key: str, default=None):
+        return self._fields.get(key, default)
+
+    def to_dict(self) -> Dict:
+        """Plain dict copy of the card fields"""
+        return dict(self._fields)
+
+    def __repr__(self) -> str:
+        return f"Card(id={self.id!r}, name_ru={self.name_ru!r})"
+
+
+class CardCatalog:
+    """Tuple-backed card catalog with an id index, loaded once per file"""
+
+    __slots__ = ("cards", "_by_id")
+
+    def __init__(self, cards: Tuple[Card, ...]):
+        self.cards = cards
+        self._by_id = {card.id: card for card in cards}
+
+    @classmethod
+    def from_file(cls, full_path: str) -> "CardCatalog":
         with open(full_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        
+
         # Full Tarot deck: 22 Major Arcana + 56 Minor Arcana = 78 cards
-        self.cards = data['major_arcana'] + data.get('minor_arcana', [])
-    
-    def shuffle(self):
-        random.shuffle(self.cards)
-    
-    def draw_card(self) -> Dict:
+        raw_cards = data['major_arcana'] + data.get('minor_arcana', [])
+        return cls(tuple(Card(fields) for fields in raw_cards))
+
+    def get(self, card_id: int) -> Optional[Card]:
+        """Look up a card by its id"""
+        return self._by_id.get(card_id)
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter(self.cards)
+
+    def __getitem__(self, index: int) -> Card:
+        return self.cards[index]
+
+
+_catalogs: Dict[str, CardCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def _resolve_cards_path(cards_file: str) -> str:
+    # Get the project root directory
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(current_dir))
+    return os.path.join(project_root, cards_file)
+
+
+def get_catalog(cards_file: str = DEFAULT_CARDS_FILE) -> CardCatalog:
+    """
+    Get the process-wide catalog for a cards file
+
+    The file is read and parsed only on first use; every later call
+    returns the same immutable catalog.
+    """
+    full_path = _resolve_cards_path(cards_file)
+    catalog = _catalogs.get(full_path)
+    if catalog is not None:
+        return catalog
+
+    with _catalogs_lock:
+        catalog = _catalogs.get(full_path)
+        if catalog is None:
+            catalog = CardCatalog.from_file(full_path)
+            _catalogs[full_path] = catalog
+    return catalog
+
+
+class DrawnCard:
+    """Lightweight view of a drawn card: shared card record + orientation + position"""
+
+    __slots__ = ("card", "is_reversed", "position")
+
+    def __init__(self, card: Card, is_reversed: bool, position: int):
+        self.card = card
+        self.is_reversed = is_reversed
+        self.position = position
+
+    def __getitem__(self, key: str):
+        if key == 'is_reversed':
+            return self.is_reversed
+        if key == 'position':
+            return self.position
+        return self.card[key]
+
+    def get(self, key: str, default=None):
+        if key == 'is_reversed':
+            return self.is_reversed
+        if key == 'position':
+            return self.position
+        return self.card.get(key, default)
+
+    def to_dict(self) -> Dict:
+        """Plain dict in the format stored with readings"""
+        data = self.card.to_dict()
+        data['is_reversed'] = self.is_reversed
+        data['position'] = self.position
+        return data
+
+    def __repr__(self) -> str:
+        return f"DrawnCard({self.card.name_ru!r}, is_reversed={self.is_reversed}, position={self.position})"
+
+
+# Shared default RNG; pass `rng` or `seed` to TarotDeck for reproducible draws
+_default_rng = random.Random()
+
+
+class TarotDeck:
+    def __init__(self, cards_file: str = DEFAULT_CARDS_FILE, rng: Optional[random.Random] = None,
+                 seed: Optional[int] = None):
+        self.catalog = get_catalog(cards_file)
+        self.cards = self.catalog.cards
+        if rng is None:
+            rng = random.Random(seed) if seed is not None else _default_rng
+        self.rng = rng
+
+    def _sample_indices(self, count: int) -> List[int]:
+        """Pick `count` distinct indices in O(count) with a sparse Fisher-Yates shuffle"""
+        total = len(self.cards)
+        count = min(count, total)
+        randrange = self.rng.randrange
+        # Only the swapped positions are remembered, the deck itself is never touched
+        swapped: Dict[int, int] = {}
+        indices = []
+        for i in range(count):
+            j = randrange(i, total)
+            indices.append(swapped.get(j, j))
+            swapped[j] = swapped.get(i, i)
+        return indices
+
+    def draw_card(self) -> DrawnCard:
         """Draw one card"""
-        self.shuffle()
-        card = self.cards[0].copy()
-        card['is_reversed'] = random.choice([True, False])
-        return card
-    
-    def draw_cards(self, count: int) -> List[Dict]:
+        return self.draw_cards(1)[0]
+
+    def draw_cards(self, count: int) -> List[DrawnCard]:
         """Draw N cards"""
-        self.shuffle()
-        cards = []
-        for i in range(min(count, len(self.cards))):
-            card = self.cards[i].copy()
-            card['is_reversed'] = random.choice([True, False])
-            card['position'] = i + 1
-            cards.append(card)
-        return cards
-    
+        cards = self.cards
+        rand = self.rng.random
+        return [
+            DrawnCard(cards[index], rand() < 0.5, position)
+            for position, index in enumerate(self._sample_indices(count), 1)
+        ]
+
     def get_card_display(self, card: Dict) -> str:
         """Format card for display"""
         name = card['name_ru']
@@ -0,0 +1,119 @@
+"""Event loop lag watchdog that reports what blocked the loop"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+from backend.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Report the loop as stalled when a heartbeat is this late
+STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "250")) / 1000
+HEARTBEAT_INTERVAL = 0.1
+# Innermost frames kept from the blocked thread's stack
+STACK_DEPTH = 25
+
+LOOP_LAG_SECONDS = registry.histogram(
+    "tarot_loop_lag_seconds", "Delay of event loop heartbeats",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+LOOP_STALLS = registry.counter("tarot_loop_stalls_total", "Event loop stalls above the threshold")
+
+
+class LoopWatchdog:
+    """
+    Measures event loop lag and captures the stack of long stalls
+
+    A heartbeat task on the loop records how late each wake-up is. A
+    monitor thread watches the heartbeat; once it is `threshold` seconds
+    overdue, the loop thread's current stack and the running task are
+    captured while the loop is still blocked, logged and counted.
+    """
+
+    def __init__(self, name: str, threshold: float = STALL_THRESHOLD, interval: float = HEARTBEAT_INTERVAL):
+        self.name = name
+        self.threshold = threshold
+        self.interval = interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._reported = False
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start watching the running loop; must be called from the loop thread"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name=f"loop-watchdog-{self.name}")
+        self._thread = threading.Thread(target=self._monitor, name=f"loop-watchdog-{self.name}", daemon=True)
+        self._thread.start()
+        logger.info(f"Loop watchdog started for {self.name} (threshold {self.threshold * 1000:.0f} ms)")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.to_thread(self._thread.join)
+        self._task = None
+        self._thread = None
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            LOOP_LAG_SECONDS.observe(lag, process=self.name)
+            if self._reported:
+                logger.warning(f"Event loop of {self.name} resumed after {lag + self.interval:.2f}s")
+            self._last_beat = time.monotonic()
+            self._reported = False
+
+    def _monitor(self):
+        while not self._stopped.wait(self.interval):
+            stalled = time.monotonic() - self._last_beat
+            if stalled >= self.threshold and not self._reported:
+                self._reported = True
+                self._report(stalled)
+
+    def _report(self, stalled: float):
+        """Log where the loop thread is right now; runs in the monitor thread"""
+        stall = self.capture()
+        LOOP_STALLS.inc(process=self.name)
+        logger.warning(
+            f"Event loop of {self.name} blocked for {stalled:.2f}s+ in task {stall['task']} "
+            f"({stall['coroutine']}) at {stall['location']}\n{stall['stack']}",
+            extra={"loop_stall": {**stall, "process": self.name, "blocked_seconds": round(stalled, 3)}}
+        )
+
+    def capture(self) -> Dict[str, str]:
+        """Running task, coroutine, innermost location and stack of the loop thread"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.extract_stack(frame, limit=STACK_DEPTH) if frame is not None else []
+        location = f"{stack[-1].filename}:{stack[-1].lineno} in {stack[-1].name}" if stack else "unknown"
+
+        # Reading the current task from another thread is racy but harmless while the loop is blocked
+        task = asyncio.current_task(self._loop) if self._loop is not None else None
+        coroutine = task.get_coro() if task is not None else None
+        return {
+            "task": task.get_name() if task is not None else "none",
+            "coroutine": getattr(coroutine, "__qualname__", "none"),
+            "location": location,
+            "stack": "".join(traceback.format_list(stack)),
+        }
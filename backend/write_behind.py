@@ -0,0 +1,128 @@
+"""Write-behind persistence of readings"""
+import asyncio
+import logging
+import os
+from collections import Counter
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Flush every FLUSH_INTERVAL seconds or as soon as BATCH_SIZE readings are queued
+FLUSH_INTERVAL = float(os.getenv("READINGS_FLUSH_INTERVAL_MS", "500")) / 1000
+BATCH_SIZE = int(os.getenv("READINGS_BATCH_SIZE", "100"))
+# Producers wait (back-pressure) once this many readings are pending
+MAX_QUEUE = int(os.getenv("READINGS_MAX_QUEUE", "5000"))
+FLUSH_ATTEMPTS = 3
+DUPLICATE_KEY = 11000
+
+
+class ReadingWriter:
+    """
+    Batches readings into insert_many and coalesced stats increments
+
+    enqueue() returns as soon as the reading is queued; a background task
+    writes batches with one insert_many into `readings` and one bulk_write
+    of per-user `stats.total_readings` increments into `users`.
+    """
+
+    def __init__(self, readings, users, flush_interval: float = FLUSH_INTERVAL,
+                 batch_size: int = BATCH_SIZE, max_queue: int = MAX_QUEUE):
+        self.readings = readings
+        self.users = users
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="reading-writer")
+            logger.info(f"Reading writer started (batch {self.batch_size}, every {self.flush_interval}s)")
+
+    async def stop(self):
+        """Flush everything still queued and stop the background task"""
+        if self._task is None:
+            return
+        self._batch_ready.set()
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Reading writer stopped, queue flushed")
+
+    async def enqueue(self, reading: Dict):
+        """Queue a reading; waits only if the queue is full"""
+        await self._queue.put(reading)
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+
+            # Wait for a full batch, but no longer than the flush interval
+            if self._queue.qsize() + 1 < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_ready.clear()
+
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[Dict]):
+        increments = Counter(reading["user_id"] for reading in batch)
+        updates = [
+            UpdateOne({"_id": user_id}, {"$inc": {"stats.total_readings": count}})
+            for user_id, count in increments.items()
+        ]
+
+        # insert_many sets `_id` on every document, so a retry after a partial
+        # write hits duplicate keys for the readings already stored
+        pending = batch
+        for attempt in range(1, FLUSH_ATTEMPTS + 1):
+            try:
+                if pending:
+                    pending = await self._insert(pending)
+                if not pending:
+                    await self.users.bulk_write(updates, ordered=False)
+                    logger.info(f"Flushed {len(batch)} readings for {len(updates)} users")
+                    return
+                logger.error(f"Failed to insert {len(pending)} of {len(batch)} readings (attempt {attempt})")
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} readings (attempt {attempt}): {e}")
+            if attempt < FLUSH_ATTEMPTS:
+                await asyncio.sleep(attempt)
+
+        what = f"{len(pending)} of {len(batch)} readings" if pending else f"stats increments of {len(batch)} readings"
+        logger.error(f"Dropped {what} after {FLUSH_ATTEMPTS} attempts")
+
+    async def _insert(self, documents: List[Dict]) -> List[Dict]:
+        """Insert documents; returns those that still need to be written"""
+        try:
+            await self.readings.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Duplicates were written by an earlier attempt; only other errors need a retry
+            return [
+                documents[error["index"]] for error in e.details.get("writeErrors", [])
+                if error.get("code") != DUPLICATE_KEY
+            ]
+        return []
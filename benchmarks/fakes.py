@@ -0,0 +1,193 @@
+"""Stand-ins for the OpenAI client and the Telegram Bot API session"""
+import asyncio
+import itertools
+import math
+import random
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+from typing import AsyncIterator, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageText, SendMessage, TelegramMethod
+from aiogram.types import Chat, Message
+
+from backend.tarot.cards import Card, CardCatalog
+
+# Filler used for generated text; ends like a channel post so PostGenerator accepts it
+FILLER_WORDS = ["карта", "энергия", "путь", "знак", "свет", "тишина", "сила", "шаг"]
+POST_ENDING = "Хочешь узнать, что это значит лично для тебя? → @taro208_bot"
+
+
+MAJOR_ARCANA = [
+    "Шут", "Маг", "Верховная Жрица", "Императрица", "Император", "Иерофант", "Влюблённые",
+    "Колесница", "Сила", "Отшельник", "Колесо Фортуны", "Справедливость", "Повешенный", "Смерть",
+    "Умеренность", "Дьявол", "Башня", "Звезда", "Луна", "Солнце", "Суд", "Мир",
+]
+MINOR_SUITS = ["Жезлов", "Кубков", "Мечей", "Пентаклей"]
+MINOR_RANKS = [
+    "Туз", "Двойка", "Тройка", "Четвёрка", "Пятёрка", "Шестёрка", "Семёрка", "Восьмёрка",
+    "Девятка", "Десятка", "Паж", "Рыцарь", "Королева", "Король",
+]
+
+
+def synthetic_catalog() -> CardCatalog:
+    """
+    Full 78-card deck with placeholder meanings
+
+    Ids follow data/tarot_cards.json (0-21 Major Arcana, then the Minor
+    Arcana), so Major Arcana notes in prompts behave as with the real deck.
+    """
+    names = MAJOR_ARCANA + [f"{rank} {suit}" for suit in MINOR_SUITS for rank in MINOR_RANKS]
+    return CardCatalog(tuple(
+        Card({
+            "id": card_id,
+            "name_ru": name,
+            "upright": f"{name}: движение, ясность, новый шаг",
+            "reversed": f"{name}: задержка, сомнение, взгляд внутрь",
+        })
+        for card_id, name in enumerate(names)
+    ))
+
+
+class LatencyModel:
+    """
+    LLM latency: lognormal time to first token plus a fixed delay per token
+
+    `ttft` is the median time to first token in seconds and `sigma` the
+    spread of its lognormal distribution (0 makes it constant).
+    """
+
+    def __init__(self, ttft: float = 0.8, sigma: float = 0.5, tokens: int = 200,
+                 token_delay: float = 0.01, seed: Optional[int] = None):
+        self.ttft = ttft
+        self.sigma = sigma
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self._rng = random.Random(seed)
+
+    def first_token(self) -> float:
+        return self.ttft * math.exp(self._rng.gauss(0, self.sigma)) if self.sigma else self.ttft
+
+    def words(self) -> list:
+        return [self._rng.choice(FILLER_WORDS) for _ in range(self.tokens)]
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens
+    )
+
+
+def _prompt_tokens(messages) -> int:
+    # Rough estimate: one token per four characters
+    return sum(len(message.get("content", "")) for message in messages) // 4
+
+
+class FakeCompletions:
+    def __init__(self, client: "FakeOpenAI"):
+        self._client = client
+
+    async def create(self, model: str, messages, stream: bool = False, **kwargs):
+        client = self._client
+        client.calls += 1
+        client.in_flight += 1
+        client.max_in_flight = max(client.max_in_flight, client.in_flight)
+        try:
+            await asyncio.sleep(client.latency.first_token())
+        except BaseException:
+            client.in_flight -= 1
+            raise
+
+        words = client.latency.words()
+        prompt_tokens = _prompt_tokens(messages)
+        if stream:
+            return self._stream(words, prompt_tokens)
+
+        try:
+            await asyncio.sleep(client.latency.token_delay * len(words))
+        finally:
+            client.in_flight -= 1
+        text = " ".join(words) + "\n\n" + POST_ENDING
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text), finish_reason="stop")],
+            usage=_usage(prompt_tokens, len(words))
+        )
+
+    async def _stream(self, words, prompt_tokens: int) -> AsyncIterator[SimpleNamespace]:
+        client = self._client
+        try:
+            for start in range(0, len(words), client.chunk_tokens):
+                chunk = words[start:start + client.chunk_tokens]
+                await asyncio.sleep(client.latency.token_delay * len(chunk))
+                yield SimpleNamespace(
+                    choices=[SimpleNamespace(delta=SimpleNamespace(content=" ".join(chunk) + " "))],
+                    usage=None
+                )
+            yield SimpleNamespace(choices=[], usage=_usage(prompt_tokens, len(words)))
+        finally:
+            client.in_flight -= 1
+
+
+class FakeOpenAI:
+    """
+    Minimal AsyncOpenAI: chat.completions.create with and without streaming
+
+    Streams yield `chunk_tokens` words per chunk. `calls` and
+    `max_in_flight` tell how many completions were started and how many
+    ran at once.
+    """
+
+    def __init__(self, latency: LatencyModel, chunk_tokens: int = 4):
+        self.latency = latency
+        self.chunk_tokens = chunk_tokens
+        self.chat = SimpleNamespace(completions=FakeCompletions(self))
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def with_options(self, **kwargs) -> "FakeOpenAI":
+        return self
+
+    async def close(self):
+        pass
+
+
+class FakeSession(BaseSession):
+    """
+    Bot API session answering every request locally after `latency` seconds
+
+    sendMessage and editMessageText return a Message so handlers can keep
+    editing what they sent; every other method returns True. Request
+    counts per method are kept in `requests`.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.requests = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None):
+        self.requests[type(method).__name__] += 1
+        await asyncio.sleep(self.latency)
+
+        if isinstance(method, (SendMessage, EditMessageText)):
+            message_id = method.message_id if isinstance(method, EditMessageText) else next(self._message_ids)
+            return Message(
+                message_id=message_id,
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text
+            ).as_(bot)
+        return True
+
+    async def stream_content(self, url: str, headers: Optional[dict] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True):
+        yield b""
+
+    async def close(self):
+        pass
@@ -0,0 +1,388 @@
+"""
+In-memory stand-in for the Motor client
+
+Implements the subset of the Motor/pymongo API that backend/database.py
+and backend/write_behind.py use: filters with $or/$not/$gte/$lte,
+$set/$inc/$unset updates, pipeline updates with the aggregation
+operators of check_and_update_limits, projections, sort/limit cursors,
+bulk writes and index bookkeeping. Anything else raises
+NotImplementedError, so a new query shape fails loudly instead of
+silently benchmarking nonsense.
+
+Every operation awaits a configurable round-trip latency.
+"""
+import asyncio
+import copy
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+MISSING = object()
+
+
+def get_path(doc: Any, path: str) -> Any:
+    """Value at a dotted path, MISSING if absent"""
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def set_path(doc: Dict, path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _compare(value: Any, operand: Any, op) -> bool:
+    if value is MISSING or value is None:
+        return False
+    try:
+        return op(value, operand)
+    except TypeError:
+        # Different BSON types never match range operators
+        return False
+
+
+def _match_operators(value: Any, condition: Dict) -> bool:
+    for op, operand in condition.items():
+        if op == "$gte":
+            matched = _compare(value, operand, lambda a, b: a >= b)
+        elif op == "$lte":
+            matched = _compare(value, operand, lambda a, b: a <= b)
+        elif op == "$eq":
+            matched = value == operand
+        elif op == "$not":
+            matched = not _match_operators(value, operand)
+        else:
+            raise NotImplementedError(f"Query operator {op}")
+        if not matched:
+            return False
+    return True
+
+
+def matches(doc: Dict, query: Dict) -> bool:
+    """Whether a document matches a query filter"""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        if key.startswith("$"):
+            raise NotImplementedError(f"Query operator {key}")
+
+        value = get_path(doc, key)
+        if isinstance(condition, dict) and condition and next(iter(condition)).startswith("$"):
+            if not _match_operators(value, condition):
+                return False
+        elif value is MISSING or value != condition:
+            return False
+    return True
+
+
+def evaluate(expr: Any, doc: Dict) -> Any:
+    """Evaluate an aggregation expression against a document"""
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = get_path(doc, expr[1:])
+        return None if value is MISSING else value
+    if isinstance(expr, list):
+        return [evaluate(item, doc) for item in expr]
+    if not (isinstance(expr, dict) and len(expr) == 1 and next(iter(expr)).startswith("$")):
+        return expr
+
+    op, args = next(iter(expr.items()))
+    if op == "$cond":
+        condition, if_true, if_false = args
+        return evaluate(if_true, doc) if evaluate(condition, doc) else evaluate(if_false, doc)
+    if op == "$ifNull":
+        value = evaluate(args[0], doc)
+        return value if value is not None else evaluate(args[1], doc)
+
+    values = [evaluate(arg, doc) for arg in args]
+    if op == "$subtract":
+        first, second = values
+        if isinstance(first, datetime) and isinstance(second, datetime):
+            # Date difference is in milliseconds, as in MongoDB
+            return int((first - second).total_seconds() * 1000)
+        return first - second
+    if op == "$add":
+        return sum(values)
+    if op == "$gte":
+        return values[0] >= values[1]
+    if op == "$eq":
+        return values[0] == values[1]
+    raise NotImplementedError(f"Expression operator {op}")
+
+
+def apply_update(doc: Dict, update: Any):
+    """Apply an update document or an update pipeline in place"""
+    if isinstance(update, list):
+        for stage in update:
+            for op, fields in stage.items():
+                if op not in ("$set", "$addFields"):
+                    raise NotImplementedError(f"Pipeline stage {op}")
+                # All fields of a stage see the document as it was before the stage
+                values = {path: evaluate(expr, doc) for path, expr in fields.items()}
+                for path, value in values.items():
+                    set_path(doc, path, value)
+        return
+
+    for op, fields in update.items():
+        if op == "$set":
+            for path, value in fields.items():
+                set_path(doc, path, copy.deepcopy(value))
+        elif op == "$unset":
+            for path in fields:
+                parts = path.split(".")
+                parent = get_path(doc, ".".join(parts[:-1])) if len(parts) > 1 else doc
+                if isinstance(parent, dict):
+                    parent.pop(parts[-1], None)
+        elif op == "$inc":
+            for path, amount in fields.items():
+                current = get_path(doc, path)
+                set_path(doc, path, (0 if current is MISSING else current) + amount)
+        else:
+            raise NotImplementedError(f"Update operator {op}")
+
+
+def _project_value(value: Any, parts: List[str]) -> Any:
+    if not parts:
+        return copy.deepcopy(value)
+    if isinstance(value, list):
+        return [
+            projected for projected in (_project_value(item, parts) for item in value)
+            if projected is not MISSING
+        ]
+    if isinstance(value, dict) and parts[0] in value:
+        inner = _project_value(value[parts[0]], parts[1:])
+        return MISSING if inner is MISSING else {parts[0]: inner}
+    return MISSING
+
+
+def _merge(target: Dict, source: Dict):
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        elif isinstance(value, list) and isinstance(target.get(key), list):
+            for existing, item in zip(target[key], value):
+                _merge(existing, item)
+        else:
+            target[key] = value
+
+
+def project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    """Copy of a document with an inclusion projection applied"""
+    if not projection:
+        return copy.deepcopy(doc)
+
+    included = [path for path, flag in projection.items() if flag and path != "_id"]
+    if any(not flag for path, flag in projection.items() if path != "_id"):
+        raise NotImplementedError("Exclusion projections")
+
+    result = {}
+    if projection.get("_id", 1) and "_id" in doc:
+        result["_id"] = doc["_id"]
+    for path in included:
+        parts = path.split(".")
+        if parts[0] not in doc:
+            continue
+        projected = _project_value(doc[parts[0]], parts[1:])
+        if projected is not MISSING:
+            _merge(result, {parts[0]: projected})
+    return result
+
+
+class MemoryCursor:
+    """find() cursor supporting sort, limit, to_list, explain and async iteration"""
+
+    def __init__(self, collection: "MemoryCollection", query: Dict, projection: Optional[Dict]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = []
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1) -> "MemoryCursor":
+        self._sort = key if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def _documents(self) -> List[Dict]:
+        docs = [doc for doc in self._collection._docs.values() if matches(doc, self._query)]
+        # Stable sorts applied from the last key to the first
+        for path, direction in reversed(self._sort):
+            docs.sort(key=lambda doc: get_path(doc, path), reverse=direction < 0)
+        if self._limit:
+            docs = docs[:self._limit]
+        return [project(doc, self._projection) for doc in docs]
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        await self._collection._roundtrip()
+        docs = self._documents()
+        return docs[:length] if length else docs
+
+    async def explain(self) -> Dict:
+        """A plan shaped like MongoDB's: IXSCAN if an index covers the filter and sort"""
+        await self._collection._roundtrip()
+        wanted = [path for path in self._query] + [path for path, _ in self._sort]
+        indexed = any(
+            [path for path, _ in keys][:len(wanted)] == wanted
+            for keys in self._collection.indexes.values()
+        )
+        scan = {"stage": "IXSCAN"} if indexed else {"stage": "COLLSCAN"}
+        plan = {"stage": "FETCH", "inputStage": scan} if indexed else scan
+        if self._sort and not indexed:
+            plan = {"stage": "SORT", "inputStage": plan}
+        if self._limit:
+            plan = {"stage": "LIMIT", "inputStage": plan}
+        return {"queryPlanner": {"winningPlan": plan}}
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in await self.to_list():
+            yield doc
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._docs: Dict[Any, Dict] = {}
+        self.indexes: Dict[str, List] = {}
+        self.operations = 0
+
+    async def _roundtrip(self):
+        self.operations += 1
+        await asyncio.sleep(self.database.client.latency)
+
+    def _first(self, query: Dict) -> Optional[Dict]:
+        if set(query) == {"_id"}:
+            return self._docs.get(query["_id"])
+        return next((doc for doc in self._docs.values() if matches(doc, query)), None)
+
+    def _insert(self, doc: Dict):
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name}")
+        self._docs[doc["_id"]] = copy.deepcopy(doc)
+
+    async def find_one(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> Optional[Dict]:
+        await self._roundtrip()
+        doc = self._first(query or {})
+        return project(doc, projection) if doc is not None else None
+
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> MemoryCursor:
+        return MemoryCursor(self, query or {}, projection)
+
+    async def insert_one(self, doc: Dict):
+        await self._roundtrip()
+        self._insert(doc)
+        return SimpleNamespace(inserted_id=doc["_id"], acknowledged=True)
+
+    async def insert_many(self, docs: List[Dict], ordered: bool = True):
+        await self._roundtrip()
+        inserted = []
+        errors = []
+        for doc in docs:
+            try:
+                self._insert(doc)
+                inserted.append(doc["_id"])
+            except DuplicateKeyError as e:
+                if ordered:
+                    raise
+                errors.append(e)
+        if errors:
+            raise errors[0]
+        return SimpleNamespace(inserted_ids=inserted, acknowledged=True)
+
+    def _update(self, query: Dict, update: Any, upsert: bool = False) -> Optional[Dict]:
+        doc = self._first(query)
+        if doc is None and upsert:
+            doc = {key: value for key, value in query.items() if not key.startswith("$")}
+            self._insert(doc)
+            doc = self._docs[doc["_id"]]
+        if doc is not None:
+            apply_update(doc, update)
+        return doc
+
+    async def update_one(self, query: Dict, update: Any, upsert: bool = False):
+        await self._roundtrip()
+        doc = self._update(query, update, upsert)
+        count = 1 if doc is not None else 0
+        return SimpleNamespace(matched_count=count, modified_count=count, acknowledged=True)
+
+    async def find_one_and_update(self, query: Dict, update: Any, projection: Optional[Dict] = None,
+                                  return_document: bool = False, upsert: bool = False) -> Optional[Dict]:
+        await self._roundtrip()
+        before = self._first(query)
+        before = copy.deepcopy(before) if before is not None else None
+        doc = self._update(query, update, upsert)
+        # ReturnDocument.AFTER is True, BEFORE is False
+        result = doc if return_document else before
+        return project(result, projection) if result is not None else None
+
+    async def bulk_write(self, requests: List, ordered: bool = True):
+        await self._roundtrip()
+        modified = 0
+        for request in requests:
+            if not isinstance(request, UpdateOne):
+                raise NotImplementedError(f"Bulk operation {type(request).__name__}")
+            if self._update(request._filter, request._doc, request._upsert) is not None:
+                modified += 1
+        return SimpleNamespace(modified_count=modified, matched_count=modified, acknowledged=True)
+
+    async def create_index(self, keys, name: Optional[str] = None, **kwargs) -> str:
+        await self._roundtrip()
+        keys = keys if isinstance(keys, list) else [(keys, 1)]
+        name = name or "_".join(f"{path}_{direction}" for path, direction in keys)
+        self.indexes[name] = keys
+        return name
+
+    async def count_documents(self, query: Dict) -> int:
+        await self._roundtrip()
+        return sum(1 for doc in self._docs.values() if matches(doc, query))
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+class MemoryClient:
+    """Drop-in for AsyncIOMotorClient; `latency` is the simulated round trip in seconds"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(self, name)
+        return self._databases[name]
+
+    def close(self):
+        pass
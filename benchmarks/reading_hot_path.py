@@ -0,0 +1,274 @@
+"""
+Benchmark of the reading handlers under concurrent users
+
+Drives the readings router through a real aiogram Dispatcher with a fake
+OpenAI client, an in-memory Mongo and a local Bot API session, then
+reports throughput, handler latency percentiles and event loop lag.
+
+    python -m benchmarks.reading_hot_path --users 500 --rounds 2
+    python -m benchmarks.reading_hot_path --users 200 --mongo-ms 2 --json results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from backend.ai import cache as ai_cache
+from backend.ai.admission import ADMISSION_REJECTED, LLM_MAX_CONCURRENT, PRIORITY_NAMES, admission
+from backend.ai import client as ai_client
+from backend.ai.cache import InterpretationCache
+from backend.bot.fsm_storage import MongoFSMStorage
+from backend.bot.handlers import readings
+from backend.database import Database
+from backend.tarot import cards
+from benchmarks.fakes import FakeOpenAI, FakeSession, LatencyModel, synthetic_catalog
+from benchmarks.memory_mongo import MemoryClient
+
+# What every simulated user does in one round
+SCENARIO = [
+    "✨ Карта дня",
+    "🌙 Расклад 3 карты",
+    "Что меня ждёт в ближайший месяц?",
+    "⭐ Совет Таро",
+    "📖 История чтений",
+]
+QUESTION_LABEL = "question"
+FIRST_USER_ID = 1_000_000
+
+
+def percentile(samples: List[float], share: float) -> float:
+    """Nearest-rank percentile of unsorted samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(share * len(ordered)) - 1))]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Count and p50/p95/p99/max in milliseconds"""
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "max_ms": max(samples, default=0.0) * 1000,
+    }
+
+
+class LoopLagProbe:
+    """Measures how late a periodic sleep wakes up, i.e. how long the loop was blocked"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+
+def make_update(bot: Bot, update_id: int, user_id: int, text: str) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+                "text": text,
+            },
+        },
+        context={"bot": bot}
+    )
+
+
+async def seed_users(db: Database, count: int, premium_share: float, rng: random.Random):
+    for index in range(count):
+        user_id = FIRST_USER_ID + index
+        await db.create_user(user_id, f"User{index}", username=f"user{index}", birthdate="01.01.1990")
+        if rng.random() < premium_share:
+            await db.set_premium(user_id)
+
+
+async def simulate_user(dp: Dispatcher, bot: Bot, user_id: int, rounds: int, think_time: float,
+                        rng: random.Random, update_ids, latencies: Dict[str, List[float]],
+                        errors: Dict[str, int]):
+    for _ in range(rounds):
+        for text in SCENARIO:
+            if think_time:
+                await asyncio.sleep(rng.uniform(0, think_time))
+            update = make_update(bot, next(update_ids), user_id, text)
+            label = text if text != SCENARIO[2] else QUESTION_LABEL
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                errors[label] += 1
+            latencies[label].append(time.perf_counter() - started)
+
+
+async def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+
+    llm = FakeOpenAI(
+        LatencyModel(
+            ttft=args.llm_ttft_ms / 1000,
+            sigma=args.llm_sigma,
+            tokens=args.llm_tokens,
+            token_delay=args.llm_token_ms / 1000,
+            seed=args.seed
+        ),
+        chunk_tokens=args.llm_chunk_tokens
+    )
+    # Handlers build TarotInterpreter() on the shared client and cache
+    ai_client._client = llm
+    ai_cache._cache = InterpretationCache(variants=args.cache_variants)
+    admission.limit = args.llm_concurrency
+    # Handlers draw from the default cards file; a synthetic deck takes its place
+    cards._catalogs[cards._resolve_cards_path(cards.DEFAULT_CARDS_FILE)] = synthetic_catalog()
+
+    db = Database(
+        "memory://benchmark", "benchmark",
+        user_cache_ttl=args.user_cache_ttl,
+        client=MemoryClient(latency=args.mongo_ms / 1000)
+    )
+    await seed_users(db, args.users, args.premium_share, rng)
+
+    session = FakeSession(latency=args.telegram_ms / 1000)
+    bot = Bot(token="42:BENCHMARK", session=session)
+    # Default aiogram MemoryStorage unless the Mongo FSM storage is benchmarked
+    storage = MongoFSMStorage(db, cache_ttl=args.fsm_cache_ttl) if args.fsm == "mongo" else None
+    dp = Dispatcher(storage=storage, db=db)
+    dp.include_router(readings.router)
+    await dp.emit_startup(bot=bot, **dp.workflow_data)
+
+    update_ids = iter(range(1, 1 << 62))
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    probe = LoopLagProbe()
+    probe.start()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        simulate_user(dp, bot, FIRST_USER_ID + index, args.rounds, args.think_ms / 1000,
+                      random.Random(rng.random()), update_ids, latencies, errors)
+        for index in range(args.users)
+    ))
+    elapsed = time.perf_counter() - started
+
+    await probe.stop()
+    await dp.emit_shutdown(bot=bot, **dp.workflow_data)
+    await bot.session.close()
+
+    all_latencies = [sample for samples in latencies.values() for sample in samples]
+    return {
+        "users": args.users,
+        "rounds": args.rounds,
+        "elapsed_s": elapsed,
+        "updates": len(all_latencies),
+        "updates_per_s": len(all_latencies) / elapsed if elapsed else 0.0,
+        "handler_latency": summarize(all_latencies),
+        "handler_latency_by_action": {label: summarize(samples) for label, samples in latencies.items()},
+        "handler_errors": dict(errors),
+        "loop_lag": summarize(probe.samples),
+        "llm_calls": llm.calls,
+        "llm_max_in_flight": llm.max_in_flight,
+        "llm_admission_rejected": {
+            name: ADMISSION_REJECTED.value(priority=name) for name in PRIORITY_NAMES.values()
+            if ADMISSION_REJECTED.value(priority=name)
+        },
+        "bot_api_requests": dict(session.requests),
+        "mongo_operations": {
+            name: collection.operations
+            for name, collection in db.db._collections.items()
+        },
+        "readings_saved": len(db.readings._docs),
+    }
+
+
+def print_report(result: Dict):
+    def row(label: str, stats: Dict):
+        print(f"  {label:<34} {stats['count']:>7} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+
+    print(f"\n{result['users']} users x {result['rounds']} rounds: {result['updates']} updates "
+          f"in {result['elapsed_s']:.2f}s ({result['updates_per_s']:.1f} updates/s)\n")
+    print(f"  {'':<34} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    row("all handlers", result["handler_latency"])
+    for label, stats in sorted(result["handler_latency_by_action"].items()):
+        row(label, stats)
+    row("event loop lag", result["loop_lag"])
+    if result["handler_errors"]:
+        print(f"\n  Handler errors: {result['handler_errors']}")
+    print(f"\n  LLM calls: {result['llm_calls']} (max {result['llm_max_in_flight']} in flight, "
+          f"rejected by admission control: {result['llm_admission_rejected'] or 'none'})")
+    print(f"  Bot API requests: {result['bot_api_requests']}")
+    print(f"  Mongo operations: {result['mongo_operations']}")
+    print(f"  Readings saved: {result['readings_saved']}\n")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="concurrent simulated users")
+    parser.add_argument("--rounds", type=int, default=1, help="scenario repetitions per user")
+    parser.add_argument("--think-ms", type=float, default=0, help="max random pause between a user's messages")
+    parser.add_argument("--premium-share", type=float, default=0.2, help="share of premium users")
+    parser.add_argument("--llm-ttft-ms", type=float, default=800, help="median LLM time to first token")
+    parser.add_argument("--llm-sigma", type=float, default=0.5, help="lognormal spread of time to first token")
+    parser.add_argument("--llm-tokens", type=int, default=200, help="tokens per completion")
+    parser.add_argument("--llm-token-ms", type=float, default=10, help="delay per generated token")
+    parser.add_argument("--llm-concurrency", type=int, default=LLM_MAX_CONCURRENT,
+                        help="LLM calls admitted at once")
+    parser.add_argument("--llm-chunk-tokens", type=int, default=4, help="tokens per streamed chunk")
+    parser.add_argument("--mongo-ms", type=float, default=1, help="Mongo round trip")
+    parser.add_argument("--telegram-ms", type=float, default=30, help="Bot API round trip")
+    parser.add_argument("--user-cache-ttl", type=float, default=0, help="Database user cache TTL (0 = off)")
+    parser.add_argument("--cache-variants", type=int, default=0, help="interpretation cache variants (0 = off)")
+    parser.add_argument("--fsm", choices=["memory", "mongo"], default="memory", help="FSM storage")
+    parser.add_argument("--fsm-cache-ttl", type=float, default=30, help="Mongo FSM storage cache TTL (0 = off)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Handler logging would dominate the measurement
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run(args))
+    if not result["llm_calls"] or not result["readings_saved"]:
+        sys.exit(f"No readings completed (LLM calls: {result['llm_calls']}, "
+                 f"handler errors: {result['handler_errors'] or 'none'}); the numbers would be meaningless")
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
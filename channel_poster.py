@@ -1,7 +1,6 @@
 import asyncio
 import logging
 import sys
-import json
 import os
 from datetime import datetime
 from pathlib import Path
@@ -12,10 +11,20 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from backend.config import config
+from backend.ai.client import close_openai_client
+from backend.bot.middlewares import RequestMetricsMiddleware
+from backend.channel.feeds import FeedCache, FeedIngestor
 from backend.channel.news_fetcher import NewsFetcher
-from backend.channel.post_generator import PostGenerator
+from backend.channel.post_buffer import PostBuffer
+from backend.channel.post_history import PostHistoryIndex
+from backend.channel.publisher import ChannelPublisher, load_registry
+from backend.channel.search_integration import perform_web_search
+from backend.channel.state_store import RotationState, create_state_store
+from backend.metrics import start_metrics_server
+from backend.watchdog import LoopWatchdog
 
 # Load environment variables
 load_dotenv()
@@ -32,236 +41,149 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-# Channel configuration
-CHANNEL_USERNAME = "@taro209"  # Your channel
+# Channel configuration: JSON registry of channels, defaults to @taro209 only
+CHANNELS_FILE = os.getenv("CHANNELS_FILE")
 
 # Bot instance
 bot = None
 
-# State file for topic rotation
-STATE_FILE = Path("/tmp/channel_poster_state.json")
+# Topic rotation state (file or MongoDB, see POSTER_STATE_BACKEND)
+STATE_FILE = Path(config.POSTER_STATE_FILE)
+# The poster's other files live next to the state file, on the same (persistent) volume
+DATA_DIR = STATE_FILE.parent
 
+# Posts are generated up to this many hours before their slot
+BUFFER_FILE = Path(os.getenv("POST_BUFFER_FILE", DATA_DIR / "channel_poster_buffer.json"))
+BUFFER_HORIZON_HOURS = 12
+BUFFER_REFILL_MINUTES = 30
 
-def load_state() -> dict:
-    """Load rotation state from file"""
-    if STATE_FILE.exists():
-        try:
-            with open(STATE_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Failed to load state: {e}")
-    return {
-        "day_rotation_index": 0,  # for 14:00 (space/science)
-        "evening_rotation_index": 0  # for 19:00 (technology/nature)
-    }
+# News feeds are fetched in the background into a local SQLite cache
+FEEDS_DB = Path(os.getenv("FEEDS_DB", DATA_DIR / "channel_poster_feeds.db"))
+FEEDS_REFRESH_MINUTES = 20
 
+# Published posts, checked so new posts don't repeat old ones
+HISTORY_FILE = Path(os.getenv("POST_HISTORY_FILE", DATA_DIR / "channel_poster_history.jsonl"))
 
-def save_state(state: dict):
-    """Save rotation state to file"""
-    try:
-        with open(STATE_FILE, 'w') as f:
-            json.dump(state, f)
-        logger.info(f"State saved: {state}")
-    except Exception as e:
-        logger.error(f"Failed to save state: {e}")
+publisher = None
+feed_ingestor = None
 
 
-def get_topic_for_time(hour: int) -> str:
-    """
-    Determine topic based on time of day with fixed rotation
-    
-    Schedule:
-    - 09:00 (morning): ✨ Energy of the Day (astrology, moon)
-    - 14:00 (day): 🌌 Space OR 🔬 Science (alternating)
-    - 19:00 (evening): 🤖 Technology OR 🌿 Nature (alternating)
-    - 22:30 (night): 🌌 Space (mysticism of the night)
-    """
-    state = load_state()
-    
-    if hour == 9:
-        # Morning: always energy
-        return "energy"
-    
-    elif hour == 14:
-        # Day: alternate between space and science
-        topics = ["space", "science"]
-        index = state["day_rotation_index"]
-        topic = topics[index % 2]
-        
-        # Update rotation for next time
-        state["day_rotation_index"] = (index + 1) % 2
-        save_state(state)
-        
-        logger.info(f"14:00 rotation: selected '{topic}' (next: {topics[(index + 1) % 2]})")
-        return topic
-    
-    elif hour == 19:
-        # Evening: alternate between technology and nature
-        topics = ["technology", "nature"]
-        index = state["evening_rotation_index"]
-        topic = topics[index % 2]
-        
-        # Update rotation for next time
-        state["evening_rotation_index"] = (index + 1) % 2
-        save_state(state)
-        
-        logger.info(f"19:00 rotation: selected '{topic}' (next: {topics[(index + 1) % 2]})")
-        return topic
-    
-    elif hour == 22:
-        # Night: always space (mystical)
-        return "space"
-    
-    else:
-        # Fallback for any other time
-        logger.warning(f"Unexpected hour {hour}, using default 'energy'")
-        return "energy"
+async def publish_slot_job(hour: int, minute: int):
+    """Slot job wrapper"""
+    await publisher.publish_slot(hour, minute)
 
 
-async def create_and_post(fixed_topic: str = None):
-    """Main function to create and post to channel"""
-    try:
-        logger.info("=" * 50)
-        logger.info("Starting post generation cycle")
-        
-        # Initialize components  
-        post_generator = PostGenerator()
-        
-        # Use topic directly without news fetcher for now
-        logger.info(f"Generating post for topic: {fixed_topic}")
-        
-        # Create simple news_data structure
-        news_data = {
-            "topic": fixed_topic or "energy",
-            "query": "",
-            "results": f"Сегодняшняя тема: {fixed_topic or 'энергия дня'}",
-            "timestamp": datetime.now()
-        }
-        
-        logger.info(f"Topic selected: {news_data['topic']}")
-        
-        # Generate post
-        logger.info("Generating post...")
-        post_text = await post_generator.generate_post(news_data)
-        
-        # Validate post
-        if not post_generator.validate_post(post_text):
-            logger.error("Generated post failed validation")
-            return
-        
-        logger.info(f"Post generated ({len(post_text)} chars)")
-        logger.info(f"Post preview: {post_text[:100]}...")
-        
-        # Publish to channel
-        logger.info(f"Publishing to channel: {CHANNEL_USERNAME}")
-        
-        try:
-            message = await bot.send_message(
-                chat_id=CHANNEL_USERNAME,
-                text=post_text,
-                parse_mode=None  # Plain text for now
-            )
-            logger.info(f"✅ Post published successfully! Message ID: {message.message_id}")
-        except Exception as e:
-            logger.error(f"❌ Failed to publish post: {e}")
-            # Log full post for debugging
-            logger.error(f"Post text: {post_text}")
-            raise
-        
-    except Exception as e:
-        logger.error(f"Error in create_and_post: {e}", exc_info=True)
+async def fill_post_buffer_job():
+    """Post buffer producer job wrapper"""
+    await publisher.fill_buffer(BUFFER_HORIZON_HOURS)
 
 
-async def morning_post_job():
-    """Morning post job wrapper"""
-    await create_and_post(fixed_topic=get_topic_for_time(9))
+async def ingest_feeds_job():
+    """News ingestion job wrapper"""
+    await feed_ingestor.ingest()
 
 
-async def day_post_job():
-    """Day post job wrapper"""
-    await create_and_post(fixed_topic=get_topic_for_time(14))
-
-
-async def evening_post_job():
-    """Evening post job wrapper"""
-    await create_and_post(fixed_topic=get_topic_for_time(19))
-
-
-async def night_post_job():
-    """Night post job wrapper"""
-    await create_and_post(fixed_topic=get_topic_for_time(22))
+async def check_channel_permissions(chat_id: str):
+    """Log whether the bot can post into a channel"""
+    logger.info(f"🔍 Checking bot permissions in channel {chat_id}...")
+    try:
+        chat = await bot.get_chat(chat_id)
+        logger.info(f"✅ Channel found: {chat.title}")
+        
+        bot_member = await bot.get_chat_member(chat_id, bot.id)
+        logger.info(f"✅ Bot status in channel: {bot_member.status}")
+        
+        if bot_member.status not in ['administrator', 'creator']:
+            logger.warning(f"⚠️ Bot is not admin in channel! Status: {bot_member.status}")
+            logger.warning(f"⚠️ Bot needs to be ADMIN with 'Post messages' permission!")
+    except Exception as e:
+        logger.error(f"❌ Cannot access channel {chat_id}: {e}")
+        logger.error(f"❌ Make sure bot is added to channel as ADMIN!")
 
 
 async def main():
     """Main entry point"""
-    global bot
+    global bot, publisher, feed_ingestor
+    
+    # Logs the stack whenever something blocks the event loop
+    loop_watchdog = LoopWatchdog("channel_poster")
+    loop_watchdog.start()
+    
+    rotation_state = RotationState(create_state_store(config.POSTER_STATE_BACKEND, STATE_FILE))
+    await rotation_state.load()
+    
+    post_buffer = PostBuffer(BUFFER_FILE)
+    logger.info(f"📦 Post buffer: {len(post_buffer)} entries in {BUFFER_FILE}")
+    
+    post_history = PostHistoryIndex(HISTORY_FILE)
+    
+    channels = load_registry(CHANNELS_FILE)
+    
+    feed_cache = FeedCache(FEEDS_DB)
+    feed_ingestor = FeedIngestor(feed_cache)
+    news_fetcher = NewsFetcher(perform_web_search, feed_cache=feed_cache)
     
     # Initialize bot
     bot = Bot(
         token=config.TELEGRAM_BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
+    bot.session.middleware(RequestMetricsMiddleware())
+    publisher = ChannelPublisher(
+        bot, channels, rotation_state, post_buffer,
+        news_fetcher=news_fetcher,
+        post_history=post_history
+    )
     
     logger.info("🌟 Channel Poster Bot starting...")
-    logger.info(f"Channel: {CHANNEL_USERNAME}")
+    logger.info(f"Channels: {', '.join(channel.chat_id for channel in channels)}")
     
     # Create scheduler
     scheduler = AsyncIOScheduler()
     
-    # Schedule posts 4 times a day with fixed topics
-    # Morning: 9:00 - Energy of the Day
+    # One job per publication time; each fans out to every channel using it
+    for hour, minute in publisher.slot_times():
+        scheduler.add_job(
+            publish_slot_job,
+            CronTrigger(hour=hour, minute=minute),
+            args=[hour, minute],
+            id=f'post_{hour:02d}{minute:02d}',
+            name=f'Post {hour:02d}:{minute:02d}'
+        )
+    
+    # News ingestion: posts read pre-fetched items instead of hitting the network
     scheduler.add_job(
-        morning_post_job,
-        CronTrigger(hour=9, minute=0),
-        id='morning_post',
-        name='Morning Post (Energy)'
+        ingest_feeds_job,
+        IntervalTrigger(minutes=FEEDS_REFRESH_MINUTES),
+        id='ingest_feeds',
+        name='News Feed Ingestion',
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True
     )
     
-    # Day: 14:00 - Space OR Science (alternating)
+    # Background producer: keeps posts for the next hours generated and validated
     scheduler.add_job(
-        day_post_job,
-        CronTrigger(hour=14, minute=0),
-        id='day_post',
-        name='Day Post (Space/Science)'
+        fill_post_buffer_job,
+        IntervalTrigger(minutes=BUFFER_REFILL_MINUTES),
+        id='fill_post_buffer',
+        name='Post Buffer Producer',
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True
     )
     
-    # Evening: 19:00 - Technology OR Nature (alternating)
-    scheduler.add_job(
-        evening_post_job,
-        CronTrigger(hour=19, minute=0),
-        id='evening_post',
-        name='Evening Post (Tech/Nature)'
-    )
+    logger.info("📅 Topic rotation configured:")
+    for channel in channels:
+        for slot in channel.slots:
+            topics = " ↔️ ".join(slot.topics)
+            logger.info(f"  - {channel.chat_id} {slot.hour:02d}:{slot.minute:02d} {topics}")
     
-    # Night: 22:30 - Space (mysticism)
-    scheduler.add_job(
-        night_post_job,
-        CronTrigger(hour=22, minute=30),
-        id='night_post',
-        name='Night Post (Space)'
-    )
+    # Check bot permissions in channels
+    for channel in channels:
+        await check_channel_permissions(channel.chat_id)
     
-    logger.info("📅 Fixed-time topic rotation configured:")
-    logger.info("  - 09:00 ✨ Energy of the Day (astrology, moon)")
-    logger.info("  - 14:00 🌌 Space ↔️ 🔬 Science (alternating)")
-    logger.info("  - 19:00 🤖 Technology ↔️ 🌿 Nature (alternating)")
-    logger.info("  - 22:30 🌌 Space (mysticism of the night)")
-    
-    # Check bot permissions in channel
-    logger.info(f"🔍 Checking bot permissions in channel {CHANNEL_USERNAME}...")
-    try:
-        chat = await bot.get_chat(CHANNEL_USERNAME)
-        logger.info(f"✅ Channel found: {chat.title}")
-        
-        bot_member = await bot.get_chat_member(CHANNEL_USERNAME, bot.id)
-        logger.info(f"✅ Bot status in channel: {bot_member.status}")
-        
-        if bot_member.status not in ['administrator', 'creator']:
-            logger.warning(f"⚠️ Bot is not admin in channel! Status: {bot_member.status}")
-            logger.warning(f"⚠️ Bot needs to be ADMIN with 'Post messages' permission!")
-    except Exception as e:
-        logger.error(f"❌ Cannot access channel {CHANNEL_USERNAME}: {e}")
-        logger.error(f"❌ Make sure bot is added to channel as ADMIN!")
+    metrics_runner = await start_metrics_server()
     
     # Start scheduler
     scheduler.start()
@@ -273,14 +195,7 @@ async def main():
     
     # Test post immediately (uses current time to determine topic)
     logger.info("🧪 Creating test post immediately...")
-    current_hour = datetime.now().hour
-    test_topic = get_topic_for_time(current_hour)
-    logger.info(f"Test post will use topic for hour {current_hour}: {test_topic}")
-    try:
-        await create_and_post(fixed_topic=test_topic)
-        logger.info("✅ Test post sent successfully!")
-    except Exception as e:
-        logger.error(f"❌ Test post failed: {e}", exc_info=True)
+    await publisher.publish_now(datetime.now().hour)
     
     try:
         # Keep running
@@ -289,7 +204,13 @@ async def main():
     except (KeyboardInterrupt, SystemExit):
         logger.info("Shutting down...")
         scheduler.shutdown()
+        await loop_watchdog.stop()
         await bot.session.close()
+        await feed_ingestor.close()
+        feed_cache.close()
+        await close_openai_client()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,4 @@
+import os
+
+# backend.config reads the bot token when backend modules are imported
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "42:TEST")
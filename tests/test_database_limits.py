@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+
+from backend.database import FREE_DAILY_LIMIT, Database  # noqa: E402
+from benchmarks.memory_mongo import MemoryClient  # noqa: E402
+
+USER_ID = 1001
+
+
+def database() -> Database:
+    return Database("memory://test", "test", client=MemoryClient())
+
+
+def test_limit_check_returns_the_new_counters():
+    async def run():
+        db = database()
+        await db.create_user(USER_ID, "Test")
+        return [await db.check_and_update_limits(USER_ID, "card_of_day") for _ in range(FREE_DAILY_LIMIT + 1)]
+
+    results = asyncio.run(run())
+
+    assert [(can_proceed, limits["daily_cards_used"]) for can_proceed, _, limits in results[:-1]] == [
+        (True, used) for used in range(1, FREE_DAILY_LIMIT + 1)
+    ]
+    assert results[-1] == (False, "card_of_day", None)
+
+
+def test_premium_users_consume_no_counter():
+    async def run():
+        db = database()
+        await db.create_user(USER_ID, "Test")
+        await db.set_premium(USER_ID)
+        return (
+            await db.check_and_update_limits(USER_ID, "card_of_day", user={"premium": True}),
+            await db.check_and_update_limits(USER_ID, "deep_spread"),
+        )
+
+    assert asyncio.run(run()) == ((True, "", None), (True, "", None))
@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+
+import pytest
+
+web = pytest.importorskip("aiohttp.web")
+test_utils = pytest.importorskip("aiohttp.test_utils")
+
+from backend.channel.feeds import FETCH_CHUNK_SIZE, FeedCache, FeedIngestor  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+ETAG = '"v1"'
+LAST_MODIFIED = "Sat, 17 Oct 2026 06:00:00 GMT"
+
+
+def fixture(name: str) -> bytes:
+    """Fixture feed with its dates set relative to now"""
+    now = datetime.now(timezone.utc)
+    recent, old = now - timedelta(hours=1), now - timedelta(days=10)
+    text = (FIXTURES / name).read_text(encoding="utf-8")
+    for marker, value in {
+        "@@RECENT_RSS@@": format_datetime(recent),
+        "@@OLD_RSS@@": format_datetime(old),
+        "@@RECENT_ATOM@@": recent.isoformat(timespec="seconds"),
+        "@@OLD_ATOM@@": old.isoformat(timespec="seconds"),
+    }.items():
+        text = text.replace(marker, value)
+    return text.encode("utf-8")
+
+
+def long_feed(fresh: int, stale: int) -> bytes:
+    """RSS with `fresh` recent items followed by `stale` old ones"""
+    now = datetime.now(timezone.utc)
+    items = [
+        f"<item><title>Item {number}</title><link>https://example.com/{number}</link>"
+        f"<description>{'x' * 200}</description><pubDate>{format_datetime(date)}</pubDate></item>"
+        for number, date in enumerate([now] * fresh + [now - timedelta(days=3)] * stale)
+    ]
+    return f'<?xml version="1.0"?><rss><channel>{"".join(items)}</channel></rss>'.encode("utf-8")
+
+
+class FeedServer:
+    """aiohttp test server with the fixture feeds; records every request it gets"""
+
+    def __init__(self, long_body: bytes = b""):
+        self.requests = []
+        self.long_body = long_body
+        self.long_sent = 0
+        app = web.Application()
+        app.router.add_get("/rss", self.feed("feed.rss", "application/rss+xml"))
+        app.router.add_get("/atom", self.feed("feed.atom", "application/atom+xml"))
+        app.router.add_get("/long", self.long)
+        self.server = test_utils.TestServer(app)
+
+    def url(self, path: str) -> str:
+        return str(self.server.make_url(path))
+
+    def feed(self, name: str, content_type: str):
+        async def handler(request):
+            self.requests.append((request.path, dict(request.headers)))
+            if request.headers.get("If-None-Match") == ETAG:
+                return web.Response(status=304)
+            return web.Response(body=fixture(name), content_type=content_type,
+                                headers={"ETag": ETAG, "Last-Modified": LAST_MODIFIED})
+        return handler
+
+    async def long(self, request):
+        self.requests.append((request.path, dict(request.headers)))
+        response = web.StreamResponse(headers={"Content-Type": "application/rss+xml"})
+        await response.prepare(request)
+        try:
+            for start in range(0, len(self.long_body), FETCH_CHUNK_SIZE):
+                chunk = self.long_body[start:start + FETCH_CHUNK_SIZE]
+                await response.write(chunk)
+                self.long_sent = start + len(chunk)
+                await asyncio.sleep(0.005)
+            await response.write_eof()
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        return response
+
+    async def __aenter__(self):
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.server.close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = FeedCache(tmp_path / "feeds.db")
+    yield cache
+    cache.close()
+
+
+def titles(cache: FeedCache, topic: str):
+    since = datetime.now(timezone.utc) - timedelta(days=1)
+    return sorted(item["title"] for item in cache.recent_items(topic, since, limit=10))
+
+
+def test_ingest_stores_fresh_rss_and_atom_items(cache):
+    async def run():
+        async with FeedServer() as server:
+            ingestor = FeedIngestor(cache, {"space": [server.url("/rss")], "science": [server.url("/atom")]})
+            try:
+                return await ingestor.ingest()
+            finally:
+                await ingestor.close()
+
+    assert asyncio.run(run()) == 4
+    assert titles(cache, "space") == ["Comet becomes visible to the naked eye", "Telescope finds a new exoplanet"]
+    assert titles(cache, "science") == ["Bees recognise human faces", "Deep sea coral glows"]
+
+
+def test_unchanged_feed_is_not_parsed_again(cache):
+    async def main():
+        async with FeedServer() as server:
+            url = server.url("/rss")
+            ingestor = FeedIngestor(cache, {})
+            try:
+                fetched = [await ingestor.fetch_feed("space", url), await ingestor.fetch_feed("space", url)]
+            finally:
+                await ingestor.close()
+            return server, url, fetched
+
+    server, url, fetched = asyncio.run(main())
+
+    assert fetched == [2, 0]
+    assert cache.get_validators(url) == (ETAG, LAST_MODIFIED)
+    # The second request is conditional and answered with 304
+    _, headers = server.requests[1]
+    assert headers["If-None-Match"] == ETAG
+    assert headers["If-Modified-Since"] == LAST_MODIFIED
+    assert len(titles(cache, "space")) == 2
+
+
+def test_download_stops_once_enough_fresh_items_were_seen(cache):
+    body = long_feed(fresh=5, stale=20000)
+
+    async def main():
+        async with FeedServer(long_body=body) as server:
+            ingestor = FeedIngestor(cache, {}, max_items_per_feed=3)
+            try:
+                added = await ingestor.fetch_feed("space", server.url("/long"))
+            finally:
+                await ingestor.close()
+            # Let the server notice the closed connection
+            await asyncio.sleep(0.1)
+            return server, added
+
+    server, added = asyncio.run(main())
+
+    assert added == 3
+    assert titles(cache, "space") == ["Item 0", "Item 1", "Item 2"]
+    assert server.long_sent < len(body)
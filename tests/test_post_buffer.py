@@ -0,0 +1,37 @@
+import asyncio
+import json
+from datetime import datetime
+
+from backend.channel.post_buffer import PostBuffer
+
+
+def test_changes_are_persisted(tmp_path):
+    path = tmp_path / "buffer.json"
+
+    async def fill():
+        buffer = PostBuffer(path)
+        await buffer.reserve("2026-01-01 09:00|@channel", "energy")
+        await buffer.reserve("2026-01-01 14:00|@channel", "space")
+        await buffer.put("2026-01-01 14:00|@channel", "space", "text")
+        await buffer.pop("2026-01-01 09:00|@channel")
+
+    asyncio.run(fill())
+
+    with open(path, encoding="utf-8") as f:
+        stored = json.load(f)
+    assert list(stored) == ["2026-01-01 14:00|@channel"]
+    assert PostBuffer(path).get("2026-01-01 14:00|@channel")["text"] == "text"
+
+
+def test_concurrent_saves_keep_the_latest_state(tmp_path):
+    path = tmp_path / "buffer.json"
+
+    async def fill():
+        buffer = PostBuffer(path)
+        await asyncio.gather(*(buffer.put(f"2026-01-01 {hour:02d}:00|@channel", "energy", str(hour))
+                               for hour in range(24)))
+        await buffer.prune(datetime(2026, 1, 1, 12))
+
+    asyncio.run(fill())
+
+    assert len(PostBuffer(path)) == 12
@@ -0,0 +1,103 @@
+import asyncio
+import random
+
+from backend.channel.post_history import (
+    BANDS,
+    ROWS_PER_BAND,
+    SIGNATURE_SIZE,
+    PostHistoryIndex,
+    minhash,
+    shingles,
+    similarity,
+)
+
+WORDS = ["карта", "энергия", "путь", "знак", "свет", "тишина", "сила", "шаг", "луна", "звезда",
+         "ветер", "море", "огонь", "время", "сердце", "дорога", "память", "утро", "тень", "голос"]
+BOT_CALL = "Хочешь узнать, что это значит лично для тебя? → @taro208_bot"
+
+
+def post(seed: int, words: int = 120) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def edit(text: str, every: int) -> str:
+    """Replace every `every`-th word"""
+    return " ".join("новое" if i % every == 0 else word for i, word in enumerate(text.split()))
+
+
+def test_lsh_bands_cover_the_signature():
+    assert BANDS * ROWS_PER_BAND == SIGNATURE_SIZE
+    # Pairs at the threshold must almost always become candidates
+    assert 1 - (1 - 0.5 ** ROWS_PER_BAND) ** BANDS > 0.99
+
+
+def test_minhash_is_deterministic():
+    text = post(1)
+    assert minhash(text) == minhash(text)
+    assert len(minhash(text)) == SIGNATURE_SIZE
+
+
+def test_minhash_ignores_bot_call_and_case():
+    text = post(1)
+    assert minhash(text) == minhash(text.upper() + "\n\n" + BOT_CALL)
+
+
+def test_minhash_estimates_jaccard():
+    first = post(1)
+    second = edit(first, 10)
+    a, b = shingles(first), shingles(second)
+    jaccard = len(a & b) / len(a | b)
+
+    assert abs(similarity(minhash(first), minhash(second)) - jaccard) < 0.2
+    assert similarity(minhash(first), minhash(post(2))) < 0.2
+
+
+def test_minhash_of_short_and_empty_text():
+    assert similarity(minhash("карта дня"), minhash("карта дня")) == 1.0
+    assert minhash("") == minhash("!!!")
+
+
+def test_find_similar_matches_near_duplicates(tmp_path):
+    index = PostHistoryIndex(tmp_path / "history.jsonl")
+    original = post(1)
+    asyncio.run(index.add(original, "@channel"))
+
+    score, match = index.find_similar(edit(original, 15) + "\n\n" + BOT_CALL)
+    assert score >= index.threshold
+    assert match["chat_id"] == "@channel"
+
+    assert index.find_similar(post(2)) is None
+
+
+def test_find_similar_is_scoped_to_the_chat(tmp_path):
+    index = PostHistoryIndex(tmp_path / "history.jsonl")
+    original = post(1)
+    asyncio.run(index.add(original, "@first"))
+
+    assert index.find_similar(original, "@first") is not None
+    assert index.find_similar(original, "@second") is None
+    assert index.is_duplicate(original, "@first")
+
+
+def test_find_similar_checks_pending_posts(tmp_path):
+    index = PostHistoryIndex(tmp_path / "history.jsonl")
+    buffered = post(3)
+
+    score, match = index.find_similar(edit(buffered, 15), "@channel", pending=[post(4), buffered])
+    assert score >= index.threshold
+    assert match["published_at"] is None
+    assert index.is_duplicate(buffered, "@channel", pending=[buffered])
+    assert not index.is_duplicate(buffered, "@channel", pending=[post(4)])
+
+
+def test_history_survives_reload(tmp_path):
+    path = tmp_path / "history.jsonl"
+    original = post(1)
+    asyncio.run(PostHistoryIndex(path).add(original, "@channel"))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"chat_id": "@channel", "published_at"\n')
+
+    index = PostHistoryIndex(path)
+    assert len(index) == 1
+    assert index.is_duplicate(original, "@channel")
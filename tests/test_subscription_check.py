@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiogram")
+
+from backend.bot.subscription_check import REQUIRED_CHANNEL, SubscriptionCache  # noqa: E402
+
+USER_ID = 1001
+
+
+class FakeBot:
+    """get_chat_member answering after `delay` seconds; counts the calls"""
+
+    def __init__(self, delay: float = 0.05, status: str = "member"):
+        self.delay = delay
+        self.status = status
+        self.calls = 0
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(status=self.status)
+
+
+def test_concurrent_checks_share_one_lookup():
+    async def run():
+        bot, cache = FakeBot(), SubscriptionCache()
+        results = await asyncio.gather(*(cache.is_subscribed(bot, USER_ID) for _ in range(5)))
+        return bot, results
+
+    bot, results = asyncio.run(run())
+
+    assert results == [True] * 5
+    assert bot.calls == 1
+
+
+def test_cancelling_the_first_caller_does_not_fail_the_others():
+    async def run():
+        bot, cache = FakeBot(status="left"), SubscriptionCache()
+        first = asyncio.create_task(cache.is_subscribed(bot, USER_ID))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.is_subscribed(bot, USER_ID)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        first.cancel()
+        results = await asyncio.gather(*waiters)
+        return bot, first, results
+
+    bot, first, results = asyncio.run(run())
+
+    assert first.cancelled()
+    assert results == [False] * 3
+    assert bot.calls == 1
+
+
+def test_waiters_retry_when_the_lookup_is_cancelled():
+    async def run():
+        bot, cache = FakeBot(), SubscriptionCache()
+        waiter = asyncio.create_task(cache.is_subscribed(bot, USER_ID))
+        await asyncio.sleep(0.01)
+        cache._in_flight[(REQUIRED_CHANNEL, USER_ID)].cancel()
+        return bot, await waiter
+
+    bot, result = asyncio.run(run())
+
+    assert result is True
+    assert bot.calls == 2
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import queue
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiogram")
+pytest.importorskip("aiohttp")
+pytest.importorskip("motor")
+pytest.importorskip("pydantic_settings")
+
+from aiogram import Bot, Dispatcher, F, Router  # noqa: E402
+
+from backend.bot import webhook  # noqa: E402
+from backend.bot.middlewares import ReadingGuardMiddleware  # noqa: E402
+from benchmarks.fakes import FakeSession  # noqa: E402
+
+USER_ID = 1001
+CARD_OF_DAY = "✨ Карта дня"
+
+
+def message_update(update_id: int, text: str, user_id: int = USER_ID) -> str:
+    return json.dumps({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Test"},
+            "text": text,
+        },
+    })
+
+
+def run_worker(bodies, handler_seconds: float = 0.2) -> SimpleNamespace:
+    """
+    Feed `bodies` through one webhook worker
+
+    Returns the readings that ran, every other handled (user id, text) in
+    the order handlers started, and the Bot API session.
+    """
+    result = SimpleNamespace(readings=[], handled=[], session=FakeSession())
+
+    async def dispatcher_factory():
+        router = Router()
+        router.message.middleware(ReadingGuardMiddleware())
+
+        @router.message(F.text == CARD_OF_DAY, flags={"reading": "card_of_day"})
+        async def reading(message):
+            result.readings.append(message.text)
+            await asyncio.sleep(handler_seconds)
+
+        @router.message()
+        async def other(message):
+            result.handled.append((message.from_user.id, message.text))
+            await asyncio.sleep(handler_seconds)
+
+        dp = Dispatcher()
+        dp.include_router(router)
+        return Bot(token="42:TEST", session=result.session), dp
+
+    updates = queue.Queue()
+    for body in bodies:
+        updates.put(body)
+    updates.put(None)
+    asyncio.run(webhook._worker_main(0, updates, dispatcher_factory))
+    return result
+
+
+def test_double_tap_runs_one_reading():
+    result = run_worker([
+        message_update(1, CARD_OF_DAY),
+        message_update(2, CARD_OF_DAY),
+    ])
+
+    assert result.readings == [CARD_OF_DAY]
+    # The second tap only gets the "already drawing" notice
+    assert result.session.requests["SendMessage"] == 1
+
+
+def test_other_users_are_not_coalesced():
+    result = run_worker([
+        message_update(1, CARD_OF_DAY, user_id=1),
+        message_update(2, CARD_OF_DAY, user_id=2),
+    ])
+
+    assert len(result.readings) == 2
+
+
+def test_one_users_burst_does_not_hold_every_slot(monkeypatch):
+    monkeypatch.setattr(webhook, "WORKER_CONCURRENCY", 2)
+    burst = [message_update(number, str(number), user_id=1) for number in range(1, 6)]
+
+    result = run_worker(burst + [message_update(6, "other", user_id=2)], handler_seconds=0.05)
+
+    # User 1's queued updates wait for their predecessor without a slot, so user 2 runs right away
+    assert result.handled[:2] == [(1, "1"), (2, "other")]
+    assert [text for user_id, text in result.handled if user_id == 1] == ["1", "2", "3", "4", "5"]
+
+
+def test_updates_beyond_the_user_backlog_are_dropped(monkeypatch):
+    monkeypatch.setattr(webhook, "WORKER_USER_BACKLOG", 2)
+
+    result = run_worker([message_update(number, str(number)) for number in range(1, 6)])
+
+    assert result.handled == [(USER_ID, "1"), (USER_ID, "2")]